@@ -0,0 +1,102 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Live Aggregates Module
+
+In-process aggregates that are updated as attempts are logged, so the
+dashboard can read summary numbers without touching the attempt store.
+"""
+
+import threading
+from collections import Counter
+
+from sketches import HyperLogLog, SpaceSaving
+
+# Heavy-hitter sketches kept at ingest time: name -> (row index, verdict filter)
+HEAVY_HITTERS = {
+    "username": (2, None),
+    "password": (3, None),
+    "ip": (1, None),
+    "attacker_ip": (1, "attacker"),
+}
+ROW_COLUMNS = {1: "ip", 2: "username", 3: "password"}
+
+
+def heavy_hitter_counts(rows):
+    """Return {sketch name: Counter} for a batch of (timestamp, ip, username, password, verdict) rows."""
+    counts = {name: Counter() for name in HEAVY_HITTERS}
+    for row in rows:
+        for name, (index, verdict) in HEAVY_HITTERS.items():
+            if verdict is None or row[4] == verdict:
+                counts[name][row[index]] += 1
+    return counts
+
+
+def heavy_hitter_seed(store, name, capacity):
+    """Return the exact top ``capacity`` (value, count) pairs for sketch ``name`` from ``store``."""
+    index, verdict = HEAVY_HITTERS[name]
+    return store.top_values(ROW_COLUMNS[index], limit=capacity, verdict=verdict)
+
+
+class LiveStats:
+    """
+    Running totals for the /api/stats endpoint.
+
+    The counters are rebuilt from the attempt store once at startup and then
+    updated incrementally by ``record_many`` for every written batch, so
+    reading them costs the same regardless of how much history has been
+    logged. Top usernames, passwords and IPs are tracked in Space-Saving
+    sketches of ``top_k_capacity`` counters each. Distinct IPs are estimated
+    with a HyperLogLog sketch, or counted exactly in a set with
+    ``exact_unique_ips`` (memory grows with the number of IPs).
+    """
+
+    def __init__(self, top_k_capacity=1000, exact_unique_ips=False, sketch_precision=12):
+        self._lock = threading.Lock()
+        self.total_attempts = 0
+        self.attacker_count = 0
+        self.exact_unique_ips = exact_unique_ips
+        self.unique_ips = set() if exact_unique_ips else HyperLogLog(sketch_precision)
+        self.top_k_capacity = top_k_capacity
+        self.sketches = {name: SpaceSaving(top_k_capacity) for name in HEAVY_HITTERS}
+
+    def rebuild(self, store):
+        """Reset the counters from the full contents of ``store``."""
+        total_attempts = store.count()
+        attacker_count = store.verdict_count("attacker")
+        unique_ips = set(store.distinct_ips()) if self.exact_unique_ips else store.ip_sketch()
+        seeds = {name: heavy_hitter_seed(store, name, self.top_k_capacity) for name in HEAVY_HITTERS}
+
+        with self._lock:
+            self.total_attempts = total_attempts
+            self.attacker_count = attacker_count
+            self.unique_ips = unique_ips
+            for name, pairs in seeds.items():
+                self.sketches[name].seed(pairs)
+
+    def record_many(self, rows):
+        """Account for a batch of (timestamp, ip, username, password, verdict) rows."""
+        counts = heavy_hitter_counts(rows)
+        with self._lock:
+            self.total_attempts += len(rows)
+            self.unique_ips.update(row[1] for row in rows)
+            self.attacker_count += sum(1 for row in rows if row[4] == "attacker")
+            for name, batch_counts in counts.items():
+                self.sketches[name].update(batch_counts)
+
+    def top_values(self, name, limit=None, min_count=1):
+        """Return (value, count) pairs from heavy-hitter sketch ``name``, most frequent first."""
+        with self._lock:
+            return self.sketches[name].top(limit, min_count)
+
+    def high_water_mark(self):
+        """Return the number of attempts written so far, which grows with every write."""
+        return self.total_attempts
+
+    def snapshot(self):
+        """Return the current counters in the /api/stats response format."""
+        with self._lock:
+            return {
+                "total_attempts": self.total_attempts,
+                "unique_ips": len(self.unique_ips) if self.exact_unique_ips else self.unique_ips.count(),
+                "attacker_count": self.attacker_count
+            }
@@ -17,20 +17,32 @@ Author: Ryan Casey
 License: MIT
 """
 
-import csv
-import joblib
+import atexit
 import os
-import json
+import threading
 import time
-import requests
 import logging
 from logging.handlers import RotatingFileHandler
 from flask import Flask, request, render_template, redirect, url_for, jsonify
-from sklearn.cluster import KMeans
 import numpy as np
 from config import Config
-import pandas as pd
-from collections import Counter, defaultdict
+from storage import BufferedAttemptWriter, create_store, rows_frame
+from aggregates import LiveStats
+from sketches import capacity_for_error
+from geocache import GeoCache, SQLiteGeoCache
+from shared_state import SharedLiveStats, SharedState, TrainerElection
+from response_cache import ResponseCache
+from live_feed import AttemptFeed, FeedPublisher, format_sse
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, RETRAIN_BUCKETS, MetricsRegistry
+from velocity import VelocityTracker
+from geolocation import GeoResolver, IPApiProvider, IPRangeDatabase
+from features import FEATURE_NAMES, FeatureSchemaError, extract_features_frame, extract_features_row
+from classifier import (
+    ModelBundle, RetrainWorker, VerdictCache, centroid_artifact_path, heuristic_verdict,
+    heuristic_verdicts, load_model_bundle, load_serving_bundle, partial_fit_bundle,
+    save_model_bundle, select_attacker_cluster
+)
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 # Initialize Flask application
@@ -41,7 +53,8 @@ app.config.from_object(Config)
 Config.validate_config()
 
 if not app.debug:
-    file_handler = RotatingFileHandler('app.log', maxBytes=10240, backupCount=10)
+    file_handler = RotatingFileHandler('app.log', maxBytes=app.config['LOG_MAX_BYTES'],
+                                       backupCount=app.config['LOG_BACKUP_COUNT'])
     file_handler.setFormatter(logging.Formatter(
         '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
     ))
@@ -50,42 +63,65 @@ if not app.debug:
     app.logger.setLevel(logging.INFO)
 
 MODEL_FILE = app.config['MODEL_FILE']
+CENTROID_FILE = centroid_artifact_path(MODEL_FILE)
 LOG_FILE = app.config['LOG_FILE']
 IP_CACHE_FILE = app.config['IP_CACHE_FILE']
 RETRAIN_THRESHOLD = app.config['RETRAIN_THRESHOLD']
-
-# Initialize global variables for enhanced model
-scaler = None
-attacker_cluster = 2
-feature_names = []
-
-# Load or create model
-if os.path.exists(MODEL_FILE):
+RETRAIN_MODE = app.config['RETRAIN_MODE']
+FULL_REFIT_INTERVAL = app.config['FULL_REFIT_INTERVAL']
+SHARED_MODE = app.config['WORKER_MODE'] == 'shared'
+
+# Per-process metrics for /metrics; scrape-time gauges are registered next to their sources
+metrics = MetricsRegistry(logger=app.logger)
+log_attempt_seconds = metrics.histogram(
+    "honeypot_log_attempt_seconds", "Time to classify (if needed) and queue one login attempt")
+classify_seconds = metrics.histogram(
+    "honeypot_classify_seconds", "Time to classify one login attempt with the model")
+geolocation_seconds = metrics.histogram(
+    "honeypot_geolocation_seconds",
+    "Time to resolve a set of IP locations; cache=miss when any had to be fetched", ["cache"])
+geolocation_lookups_total = metrics.counter(
+    "honeypot_geolocation_lookups_total", "IP locations resolved, by geolocation cache result", ["cache"])
+write_flush_seconds = metrics.histogram(
+    "honeypot_write_flush_seconds", "Time to append one batch of attempts to the store (including fsync)")
+write_flush_rows_total = metrics.counter(
+    "honeypot_write_flush_rows_total", "Attempts appended to the store by the group-commit writer")
+retrain_seconds = metrics.histogram(
+    "honeypot_retrain_seconds", "Time to retrain the model", buckets=RETRAIN_BUCKETS)
+api_request_seconds = metrics.histogram(
+    "honeypot_api_request_seconds", "Time to answer a dashboard API request", ["route"])
+verdicts_total = metrics.counter(
+    "honeypot_verdicts_total", "Login attempts classified, by verdict", ["verdict"])
+classification_fallbacks_total = metrics.counter(
+    "honeypot_classification_fallbacks_total",
+    "Attempts classified by the username/password heuristic instead of the model", ["reason"])
+retrain_runs_total = metrics.counter(
+    "honeypot_retrain_runs_total", "Model retrains completed, by mode", ["mode"])
+
+# In shared mode, state that must agree across worker processes lives in SQLite
+if SHARED_MODE:
+    shared_state = SharedState(app.config['SHARED_STATE_DB'])
+    trainer_election = TrainerElection(app.config['TRAINER_LOCK_FILE'])
+    if app.config['ATTEMPT_STORE'] != 'sqlite':
+        app.logger.warning("WORKER_MODE=shared works best with ATTEMPT_STORE=sqlite.")
+
+# Load the model, checking its feature schema once here rather than per request;
+# without a usable model, attempts are classified heuristically until the first retrain.
+# Requests only need the centroid artifact; the full model is loaded when training.
+# The whole bundle is swapped at once after retraining
+current_model = ModelBundle(None)
+model_rejected = False
+if os.path.exists(MODEL_FILE) or os.path.exists(CENTROID_FILE):
     try:
-        model_data = joblib.load(MODEL_FILE)
-        if isinstance(model_data, dict):
-            # New enhanced model format
-            model = model_data['model']
-            scaler = model_data.get('scaler')
-            feature_names = model_data.get('feature_names', [])
-            n_clusters = model_data.get('n_clusters', 2)
-            
-            # Find attacker cluster (highest threat indicators)
-            attacker_cluster = 2  # Based on training results
-        else:
-            # Old simple model format
-            model = model_data
-            scaler = None
-            attacker_cluster = 1
+        current_model = load_serving_bundle(MODEL_FILE)
     except Exception as e:
-        app.logger.error(f"Error loading model: {e}")
-        model = KMeans(n_clusters=2)
-        scaler = None
-        attacker_cluster = 1
-else:
-    model = KMeans(n_clusters=2)
-    scaler = None
-    attacker_cluster = 1
+        app.logger.error(f"Error loading model, classifying heuristically until retrained: {e}")
+        model_rejected = True
+metrics.callback("honeypot_model_version", "Version of the model classifying attempts (0 if untrained)",
+                 "gauge", lambda: current_model.version)
+
+# Incremental retrains since the last full refit
+retrains_since_full_refit = 0
 
 # Track how many new logs since last training
 if os.path.exists("log_count.txt"):
@@ -94,317 +130,483 @@ if os.path.exists("log_count.txt"):
 else:
     new_logs_count = 0
 
-# Load IP cache or create empty dict
-if os.path.exists(IP_CACHE_FILE):
-    with open(IP_CACHE_FILE, "r") as f:
-        ip_cache = json.load(f)
+# Bounded LRU/TTL geolocation cache, persisted write-behind to a journal,
+# or kept in the shared database so workers reuse each other's lookups
+if SHARED_MODE:
+    ip_cache = SQLiteGeoCache(
+        app.config['SHARED_STATE_DB'],
+        max_entries=app.config['GEO_CACHE_MAX_ENTRIES'],
+        positive_ttl=app.config['GEO_CACHE_TTL'],
+        negative_ttl=app.config['GEO_CACHE_NEGATIVE_TTL'],
+        legacy_path=IP_CACHE_FILE,
+        logger=app.logger
+    )
 else:
-    ip_cache = {}
-
-def extract_features_from_log_row(ip, username, password):
-    """Extract enhanced features for better attack detection"""
-    # Basic features
-    username_len = len(username)
-    password_len = len(password)
-    ip_parts = ip.split('.')
-    ip_score = sum(int(part) for part in ip_parts if part.isdigit())
-    
-    # Advanced features
-    common_usernames = {"admin", "administrator", "root", "sa", "oracle", "test", "guest", "user"}
-    weak_passwords = {"password", "123456", "admin", "password123", "12345", "qwerty", "abc123"}
-    
-    username_is_common = 1 if username.lower() in common_usernames else 0
-    password_is_weak = 1 if password.lower() in weak_passwords else 0
-    ip_entropy = len(set(ip_parts)) / 4.0  # IP diversity
-    
-    features = np.array([[
-        username_len, password_len, ip_score,
-        username_is_common, password_is_weak, ip_entropy
-    ]])
-    
-    return features
+    ip_cache = GeoCache(
+        app.config['GEO_CACHE_JOURNAL'],
+        max_entries=app.config['GEO_CACHE_MAX_ENTRIES'],
+        positive_ttl=app.config['GEO_CACHE_TTL'],
+        negative_ttl=app.config['GEO_CACHE_NEGATIVE_TTL'],
+        flush_interval=app.config['GEO_CACHE_FLUSH_INTERVAL'],
+        legacy_path=IP_CACHE_FILE,
+        logger=app.logger
+    )
+    atexit.register(ip_cache.flush)
+
+# Offline IP-range database, if configured; the HTTP API only handles its misses
+ip_range_db = None
+if app.config['GEOIP_RANGES_CSV'] or os.path.exists(app.config['GEOIP_DB_FILE']):
+    try:
+        ip_range_db = IPRangeDatabase.open(app.config['GEOIP_RANGES_CSV'], app.config['GEOIP_DB_FILE'])
+        app.logger.info(f"Loaded offline geolocation database with {len(ip_range_db)} ranges.")
+    except Exception as e:
+        app.logger.error(f"Error loading offline geolocation database: {e}")
+
+def on_geolocation_resolved(seconds, hits, misses):
+    geolocation_seconds.labels("miss" if misses else "hit").observe(seconds)
+    if hits:
+        geolocation_lookups_total.labels("hit").inc(hits)
+    if misses:
+        geolocation_lookups_total.labels("miss").inc(misses)
+
+# Concurrent, rate-limited geolocation for cache misses
+geo_resolver = GeoResolver(
+    IPApiProvider(
+        api_url=app.config['GEOLOCATION_API_URL'],
+        batch_url=app.config['GEOLOCATION_BATCH_URL'],
+        timeout=app.config['REQUEST_TIMEOUT']
+    ),
+    ip_cache,
+    requests_per_minute=app.config['GEOLOCATION_REQUESTS_PER_MINUTE'],
+    max_workers=app.config['GEOLOCATION_WORKERS'],
+    logger=app.logger,
+    offline=ip_range_db,
+    on_resolve=on_geolocation_resolved
+)
+metrics.callback("honeypot_geolocation_errors_total", "Geolocation provider requests that failed",
+                 "counter", lambda: geo_resolver.errors)
+
+# Attempt storage backend (CSV by default, SQLite for large installs)
+attempt_store = create_store(
+    app.config,
+    classifier=lambda frame: classify_many(frame)
+)
+metrics.callback("honeypot_log_size_bytes", "Size of the attempt log (with its segments) or database file",
+                 "gauge", lambda: attempt_store.storage_bytes())
+
+# Running totals for /api/stats, rebuilt from the store once the classifier is defined
+# Top-K sketches get enough counters to keep their overcount within TOP_K_ERROR
+top_k_capacity = capacity_for_error(app.config['TOP_K_ERROR'])
+live_stats_options = {
+    "top_k_capacity": top_k_capacity,
+    "exact_unique_ips": app.config['UNIQUE_IPS_EXACT'],
+    "sketch_precision": app.config['UNIQUE_IP_SKETCH_PRECISION'],
+}
+if SHARED_MODE:
+    live_stats = SharedLiveStats(shared_state, **live_stats_options)
+else:
+    live_stats = LiveStats(**live_stats_options)
+# Set once the counters have been rebuilt; batches written before that are counted by the rebuild
+live_stats_ready = False
 
+@retrain_seconds.time()
 def retrain_model():
-    """Retrain the model with new data using enhanced features"""
-    global model, new_logs_count, scaler, attacker_cluster
-
-    logs = []
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, newline='') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) >= 4:
-                    timestamp, ip, username, password = row
-                    features = extract_features_from_log_row(ip, username, password)
-                    logs.append(features[0])  # Extract the array from the 2D array
-
-    if len(logs) >= 10:
+    """Retrain the model with new data using enhanced features and hot-swap it in"""
+    global current_model, retrains_since_full_refit
+    
+    bundle = current_model
+    if (RETRAIN_MODE == "incremental" and bundle.model is None and bundle.watermark is not None
+            and os.path.exists(MODEL_FILE)):
+        # Requests are served from the centroid artifact; partial_fit needs the full model
+        bundle = load_model_bundle(MODEL_FILE)
+    if (RETRAIN_MODE == "incremental" and bundle.watermark is not None
+            and hasattr(bundle.model, "partial_fit") and hasattr(bundle.scaler, "partial_fit")
+            and retrains_since_full_refit < FULL_REFIT_INTERVAL):
+        retrain_model_incremental(bundle)
+        return
+
+    rows, watermark = attempt_store.rows_since(None)
+
+    if len(rows) >= 10:
+        # sklearn is only needed for training, so it is imported here
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+        
+        X = extract_features_frame(rows_frame(rows))
+        version = bundle.version + 1
         try:
             from sklearn.preprocessing import StandardScaler
             
-            X = np.array(logs)
-            
             # Scale features
             scaler = StandardScaler()
             X_scaled = scaler.fit_transform(X)
             
-            # Train model
-            model = KMeans(n_clusters=5, random_state=42)
-            model.fit(X_scaled)
-            
-            # Save enhanced model
-            model_data = {
-                'model': model,
-                'scaler': scaler,
-                'feature_names': ['username_length', 'password_length', 'ip_score', 
-                                'username_is_common', 'password_is_weak', 'ip_entropy'],
-                'n_clusters': 5
-            }
-            
-            joblib.dump(model_data, MODEL_FILE)
+            # Train model; incremental mode needs a model that supports partial_fit
+            if RETRAIN_MODE == "incremental":
+                model = MiniBatchKMeans(n_clusters=5, random_state=42, n_init=3)
+            else:
+                model = KMeans(n_clusters=5, random_state=42, n_init=10)
+            labels = model.fit_predict(X_scaled)
             
-            # Reset counter
-            new_logs_count = 0
-            with open("log_count.txt", "w") as f:
-                f.write(str(new_logs_count))
-                
-            app.logger.info(f"Model retrained on {len(logs)} logs with enhanced features.")
+            bundle = ModelBundle(model, scaler, select_attacker_cluster(X, labels, 5), FEATURE_NAMES,
+                                 version, watermark)
             
         except Exception as e:
             app.logger.error(f"Retraining failed: {e}")
             # Fallback to simple retraining
-            X = np.array(logs)
-            model = KMeans(n_clusters=2, random_state=42)
-            model.fit(X)
-            joblib.dump(model, MODEL_FILE)
+            model = KMeans(n_clusters=2, random_state=42, n_init=10)
+            labels = model.fit_predict(X)
+            bundle = ModelBundle(model, None, select_attacker_cluster(X, labels, 2), FEATURE_NAMES, version)
+        
+        save_model_bundle(bundle, MODEL_FILE)
+        
+        # Single reference assignment: classifiers see either the old or the new bundle
+        current_model = bundle
+        retrains_since_full_refit = 0
+        retrain_runs_total.labels("full").inc()
+        app.logger.info(f"Model v{version} retrained on {len(rows)} logs with enhanced features.")
+
+def retrain_model_incremental(bundle):
+    """Update the model with only the rows logged since it was last trained"""
+    global current_model, retrains_since_full_refit
+    
+    rows, watermark = attempt_store.rows_since(bundle.watermark)
+    if not rows:
+        # Still counts toward the periodic full refit, so a stuck watermark cannot stop learning
+        retrains_since_full_refit += 1
+        return
+    
+    X_new = extract_features_frame(rows_frame(rows))
+    version = bundle.version + 1
+    bundle = partial_fit_bundle(bundle, X_new, version, watermark)
+    save_model_bundle(bundle, MODEL_FILE)
+    
+    current_model = bundle
+    retrains_since_full_refit += 1
+    retrain_runs_total.labels("incremental").inc()
+    app.logger.info(f"Model v{version} incrementally updated with {len(rows)} new logs.")
+
+retrain_worker = RetrainWorker(retrain_model, logger=app.logger)
+
+# Replace a rejected model (e.g. one from an older feature schema) without waiting for new logs
+if model_rejected and (not SHARED_MODE or trainer_election.try_acquire()):
+    retrain_worker.request()
+
+def model_files_mtime():
+    """Modification times of the model file and its centroid artifact (None if missing)"""
+    return tuple(
+        os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        for path in (MODEL_FILE, CENTROID_FILE)
+    )
+
+# Model file modification times of the bundle this process is using
+model_file_mtime = model_files_mtime()
+
+def reload_model_if_changed():
+    """Pick up a model saved by another worker process"""
+    global current_model, model_file_mtime
+    mtime = model_files_mtime()
+    if mtime == model_file_mtime or mtime == (None, None):
+        return
+    model_file_mtime = mtime
+    try:
+        bundle = load_serving_bundle(MODEL_FILE)
+    except FeatureSchemaError as e:
+        app.logger.error(f"Ignoring {MODEL_FILE}: {e}")
+        return
+    if bundle.version != current_model.version:
+        current_model = bundle
+        app.logger.info(f"Loaded model v{bundle.version} from {MODEL_FILE}.")
+
+def shared_mode_loop():
+    """Reload newer models and, on the elected trainer, run flagged retrains"""
+    while True:
+        try:
+            reload_model_if_changed()
+            if trainer_election.try_acquire() and shared_state.take_retrain_request():
+                retrain_worker.request()
+        except Exception as e:
+            app.logger.error(f"Shared state refresh failed: {e}")
+        time.sleep(app.config['MODEL_RELOAD_INTERVAL'])
+
+# Live attack feed: the newest attempts, pushed to SSE clients and used for backfill
+attempt_feed = AttemptFeed(maxlen=app.config['LIVE_FEED_SIZE'])
+
+def feed_events(batch):
+    """Turn a written batch into live feed events with their locations"""
+    locations = geo_resolver.resolve_many(row[1] for row in batch)
+    return [
+        {
+            'timestamp': timestamp,
+            'ip': ip,
+            'username': username,
+            'password': password,
+            'classification': verdict,
+            'location': locations[ip]
+        }
+        for timestamp, ip, username, password, verdict in batch
+    ]
+
+if SHARED_MODE:
+    # Events go through the shared database so every worker's clients see them
+    feed_publisher = FeedPublisher(
+        feed_events,
+        lambda events: shared_state.add_feed_events(events, keep=attempt_feed.maxlen),
+        logger=app.logger
+    )
+else:
+    feed_publisher = FeedPublisher(feed_events, attempt_feed.publish, logger=app.logger)
 
-def log_attempt(ip, username, password):
+def on_attempts_written(batch):
+    """Count persisted attempts and schedule retraining; runs once per written batch"""
     global new_logs_count
-    timestamp = str(datetime.now())
-    with open(LOG_FILE, "a", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([timestamp, ip, username, password])
-    new_logs_count += 1
+    if live_stats_ready:
+        live_stats.record_many(batch)
+    feed_publisher.submit(batch)
+    if SHARED_MODE:
+        # Any worker may cross the threshold; only the elected trainer fits
+        if (shared_state.add_new_logs(len(batch), RETRAIN_THRESHOLD)
+                and trainer_election.try_acquire() and shared_state.take_retrain_request()):
+            retrain_worker.request()
+        return
+    new_logs_count += len(batch)
+    if new_logs_count >= RETRAIN_THRESHOLD:
+        # Fit off the request path; requests made during a fit are coalesced
+        new_logs_count = 0
+        retrain_worker.request()
     with open("log_count.txt", "w") as f:
         f.write(str(new_logs_count))
-    if new_logs_count >= RETRAIN_THRESHOLD:
-        retrain_model()
 
-def classify_with_model(ip, username, password):
+def on_attempts_flushed(seconds, rows):
+    write_flush_seconds.observe(seconds)
+    write_flush_rows_total.inc(rows)
+
+# Group-commit writer: requests enqueue, one thread appends batches to the store
+attempt_writer = BufferedAttemptWriter(
+    attempt_store,
+    max_queue=app.config['WRITE_QUEUE_SIZE'],
+    batch_size=app.config['WRITE_BATCH_SIZE'],
+    flush_interval=app.config['WRITE_FLUSH_INTERVAL'],
+    fsync=app.config['WRITE_FSYNC'],
+    fsync_interval=app.config['WRITE_FSYNC_INTERVAL'],
+    on_flush=on_attempts_written,
+    logger=app.logger,
+    on_write=on_attempts_flushed
+)
+atexit.register(attempt_writer.close)
+
+def feed_relay_loop():
+    """Copy live feed events published by any worker into this worker's feed"""
+    while True:
+        try:
+            attempt_feed.publish_numbered(shared_state.feed_events_since(attempt_feed.last_seq))
+        except Exception as e:
+            app.logger.error(f"Live feed relay failed: {e}")
+        time.sleep(app.config['LIVE_FEED_POLL_INTERVAL'])
+
+if SHARED_MODE:
+    threading.Thread(target=shared_mode_loop, name="shared-state", daemon=True).start()
+    threading.Thread(target=feed_relay_loop, name="feed-relay", daemon=True).start()
+
+# Per-IP attempt velocity, for the model's activity features and the brute-force fast path
+velocity_tracker = VelocityTracker(max_ips=app.config['VELOCITY_TRACKER_MAX_IPS'])
+BRUTE_FORCE_THRESHOLD = app.config['BRUTE_FORCE_THRESHOLD']
+
+@log_attempt_seconds.time()
+def log_attempt(ip, username, password, verdict=None):
+    timestamp = str(datetime.now())
+    if verdict is None:
+        verdict = classify_attempt(ip, username, password)
+    attempt_writer.submit(timestamp, ip, username, password, verdict)
+
+def classify_attempt(ip, username, password):
+    """Track the attempt's IP and classify it, skipping the model for IPs already brute-forcing"""
+    velocity, distinct_usernames = velocity_tracker.record(ip, username)
+    if BRUTE_FORCE_THRESHOLD and velocity >= BRUTE_FORCE_THRESHOLD:
+        verdict = "attacker"
+    else:
+        verdict = classify_with_model(ip, username, password, velocity, distinct_usernames)
+    verdicts_total.labels(verdict).inc()
+    return verdict
+
+# Verdicts for repeated feature vectors, emptied whenever the model version changes
+verdict_cache = VerdictCache(max_entries=app.config['VERDICT_CACHE_SIZE'])
+
+@classify_seconds.time()
+def classify_with_model(ip, username, password, velocity=1, distinct_usernames=1):
     """Classify login attempt using enhanced ML model"""
-    global model, scaler, attacker_cluster
+    bundle = current_model
+    if not bundle.is_trained:
+        classification_fallbacks_total.labels("untrained").inc()
+        return heuristic_verdict(username, password)
     
     try:
-        features = extract_features_from_log_row(ip, username, password)
+        features = extract_features_row(ip, username, password, velocity, distinct_usernames)
+        key = features.tobytes()
+        verdict = verdict_cache.get(bundle.version, key)
+        if verdict is not None:
+            return verdict
         
-        # Apply scaling if available
-        if scaler is not None:
-            features_scaled = scaler.transform(features)
-        else:
-            features_scaled = features
-            
-        prediction = model.predict(features_scaled)[0]
-        
-        # Check if this cluster is the attacker cluster
-        is_attacker = (prediction == attacker_cluster)
-        
-        return "attacker" if is_attacker else "normal_user"
+        # Nearest centroid, with the scaler folded in
+        verdict = "attacker" if bundle.is_attacker(features)[0] else "normal_user"
+        verdict_cache.put(bundle.version, key, verdict)
+        return verdict
         
     except Exception as e:
         app.logger.error(f"Classification error: {e}")
+        classification_fallbacks_total.labels("error").inc()
         # Fallback to simple heuristic
-        common_usernames = {"admin", "administrator", "root", "sa"}
-        weak_passwords = {"password", "123456", "admin"}
-        
-        if username.lower() in common_usernames or password.lower() in weak_passwords:
-            return "attacker"
-        return "normal_user"
-
-def get_ip_location(ip):
-    if ip in ip_cache:
-        return ip_cache[ip]
+        return heuristic_verdict(username, password)
 
+def classify_many(df):
+    """Classify every row of a DataFrame with one vectorized nearest-centroid pass"""
+    bundle = current_model
+    
+    if len(df) == 0:
+        return np.array([], dtype=object)
+    if not bundle.is_trained:
+        classification_fallbacks_total.labels("untrained").inc(len(df))
+        return heuristic_verdicts(df)
+    
     try:
-        response = requests.get(f"http://ip-api.com/json/{ip}?fields=status,country,lat,lon,query", timeout=5)
-        response.raise_for_status()
-        data = response.json()
+        # Look up each distinct feature vector once; only cache misses reach the model
+        features, inverse = np.unique(extract_features_frame(df), axis=0, return_inverse=True)
+        keys = [row.tobytes() for row in features]
+        cached = verdict_cache.get_many(bundle.version, keys)
+        verdicts = np.array(cached, dtype=object)
+        missing = [i for i, verdict in enumerate(cached) if verdict is None]
+        
+        if len(missing):
+            verdicts[missing] = np.where(bundle.is_attacker(features[missing]), "attacker", "normal_user")
+            verdict_cache.put_many(bundle.version, ((keys[i], verdicts[i]) for i in missing))
+        
+        return verdicts[inverse.reshape(-1)]
         
-        if data["status"] == "success":
-            ip_cache[ip] = {"lat": data["lat"], "lon": data["lon"], "country": data["country"]}
-        else:
-            app.logger.warning(f"Failed to get location for IP {ip}: {data.get('message', 'Unknown error')}")
-            ip_cache[ip] = None
-            
-    except requests.RequestException as e:
-        app.logger.error(f"Network error getting location for {ip}: {e}")
-        ip_cache[ip] = None
     except Exception as e:
-        app.logger.error(f"Unexpected error getting location for {ip}: {e}")
-        ip_cache[ip] = None
+        app.logger.error(f"Batch classification error: {e}")
+        classification_fallbacks_total.labels("error").inc(len(df))
+        # Fallback to simple heuristic
+        return heuristic_verdicts(df)
 
-    with open(IP_CACHE_FILE, "w") as f:
-        json.dump(ip_cache, f)
-    
-    time.sleep(0.5)
-    return ip_cache[ip]
+def get_ip_location(ip):
+    return geo_resolver.resolve(ip)
 
 def get_attackers_locations():
-    ips = set()
-    try:
-        with open(LOG_FILE, "r") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) >= 4:
-                    _, ip, _, _ = row
-                    ips.add(ip)
-    except FileNotFoundError:
-        pass
-
     locations = []
-    for ip in ips:
-        loc = get_ip_location(ip)
+    for ip, loc in geo_resolver.resolve_many(attempt_store.distinct_ips()).items():
         if loc:
             locations.append({"ip": ip, "lat": loc["lat"], "lon": loc["lon"], "country": loc["country"]})
     return locations
 
 def get_stats():
-    # Example stats: total login attempts, total unique IPs, attackers count
-    total_attempts = 0
-    unique_ips = set()
-    attacker_count = 0
+    # Total login attempts, total unique IPs and attackers count, kept live at ingest
+    ensure_live_stats()
+    return live_stats.snapshot()
 
-    try:
-        with open(LOG_FILE, "r") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) >= 4:
-                    total_attempts += 1
-                    _, ip, username, password = row
-                    unique_ips.add(ip)
-                    if classify_with_model(ip, username, password) == "attacker":
-                        attacker_count += 1
-    except FileNotFoundError:
-        pass
-
-    return {
-        "total_attempts": total_attempts,
-        "unique_ips": len(unique_ips),
-        "attacker_count": attacker_count
-    }
-
-def get_detailed_analytics():
+def get_detailed_analytics(since=None, until=None, granularity="hour"):
     """Generate comprehensive analytics about attackers and attacks"""
+    now = datetime.now()
+    until = until or now
+    since = since or until - timedelta(days=app.config['ANALYTICS_WINDOW_DAYS'])
     try:
-        df = pd.read_csv(LOG_FILE, names=["timestamp", "ip", "username", "password"])
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Basic stats
-        total_attempts = len(df)
-        unique_ips = df['ip'].nunique()
-        
-        # Classify all attempts
-        attacker_attempts = []
-        normal_attempts = []
-        for _, row in df.iterrows():
-            classification = classify_with_model(row['ip'], row['username'], row['password'])
-            if classification == "attacker":
-                attacker_attempts.append(row)
-            else:
-                normal_attempts.append(row)
-        
-        attacker_df = pd.DataFrame(attacker_attempts) if attacker_attempts else pd.DataFrame()
+        # Basic stats, from the live counters
+        ensure_live_stats()
+        stats = live_stats.snapshot()
+        total_attempts = stats["total_attempts"]
+        unique_ips = stats["unique_ips"]
+        attacker_count = stats["attacker_count"]
+        credentials = attempt_store.credential_stats()
         
         analytics = {
             "basic_stats": {
                 "total_attempts": total_attempts,
                 "unique_ips": unique_ips,
-                "attacker_count": len(attacker_attempts),
-                "success_rate": round((len(attacker_attempts) / total_attempts * 100), 2) if total_attempts > 0 else 0
+                "attacker_count": attacker_count,
+                "success_rate": round((attacker_count / total_attempts * 100), 2) if total_attempts > 0 else 0
             },
-            "top_usernames": dict(Counter(df["username"]).most_common(10)),
-            "top_passwords": dict(Counter(df["password"]).most_common(10)),
-            "top_attacker_ips": dict(Counter([a['ip'] for a in attacker_attempts]).most_common(10)),
+            "top_usernames": dict(live_stats.top_values("username", limit=10)),
+            "top_passwords": dict(live_stats.top_values("password", limit=10)),
+            "top_attacker_ips": dict(live_stats.top_values("attacker_ip", limit=10)),
             "attacks_by_hour": {},
             "attacks_by_day": {},
             "credential_patterns": {
-                "avg_username_length": round(df['username'].str.len().mean(), 2),
-                "avg_password_length": round(df['password'].str.len().mean(), 2),
+                "avg_username_length": round(credentials["avg_username_length"], 2),
+                "avg_password_length": round(credentials["avg_password_length"], 2),
                 "common_username_patterns": [],
                 "common_password_patterns": []
             },
             "recent_attacks": []
         }
-          # Time-based analysis with complete hour coverage
-        if not df.empty:
-            df['hour'] = df['timestamp'].dt.hour
-            df['date'] = df['timestamp'].dt.date
-            
-            # Ensure all 24 hours are represented
-            hourly_counts = df.groupby('hour').size().to_dict()
-            analytics["attacks_by_hour"] = {str(hour): hourly_counts.get(hour, 0) for hour in range(24)}
-            
-            # Daily analysis with last 7 days
-            daily_counts = df.groupby('date').size().to_dict()
-            analytics["attacks_by_day"] = {str(k): v for k, v in daily_counts.items()}
-            
-            # Add peak analysis
-            if hourly_counts:
-                peak_hour = max(hourly_counts.items(), key=lambda x: x[1])
-                analytics["peak_hour"] = {
-                    "hour": peak_hour[0],
-                    "attacks": peak_hour[1]
-                }
-            
-            # Add attack intensity analysis
-            total_hours_with_attacks = len([h for h in hourly_counts.values() if h > 0])
-            avg_attacks_per_active_hour = sum(hourly_counts.values()) / max(total_hours_with_attacks, 1)
-            
-            analytics["attack_intensity"] = {
-                "active_hours": total_hours_with_attacks,
-                "avg_per_active_hour": round(avg_attacks_per_active_hour, 1),
-                "total_attacks_today": sum(hourly_counts.values())
+        # Time-based analysis, answered from the rollups for the requested range
+        hour_buckets = attempt_store.bucket_counts("hour", since, until)
+        hourly_counts = defaultdict(int)
+        for bucket, count in hour_buckets.items():
+            if bucket[11:13].isdigit():
+                hourly_counts[int(bucket[11:13])] += count
+        # Ensure all 24 hours are represented
+        analytics["attacks_by_hour"] = {str(hour): hourly_counts.get(hour, 0) for hour in range(24)}
+        analytics["attacks_by_day"] = attempt_store.bucket_counts("day", since, until)
+        analytics["timeline"] = {
+            "granularity": granularity,
+            "since": since.isoformat(sep=" "),
+            "until": until.isoformat(sep=" "),
+            "buckets": attempt_store.bucket_counts(granularity, since, until),
+            "unique_ips": attempt_store.unique_ip_estimate(since, until),
+            "unique_attacker_ips": attempt_store.unique_ip_estimate(since, until, verdict="attacker")
+        }
+        
+        # Distinct IPs over fixed trailing windows, merged from per-bucket sketches
+        windows = {"last_hour": timedelta(hours=1), "last_day": timedelta(days=1), "last_30_days": timedelta(days=30)}
+        analytics["unique_ips_by_window"] = {
+            name: attempt_store.unique_ip_estimate(now - window, now) for name, window in windows.items()
+        }
+        analytics["unique_attacker_ips_by_window"] = {
+            name: attempt_store.unique_ip_estimate(now - window, now, verdict="attacker")
+            for name, window in windows.items()
+        }
+        
+        # Add peak analysis
+        if hourly_counts:
+            peak_hour = max(hourly_counts.items(), key=lambda x: x[1])
+            analytics["peak_hour"] = {
+                "hour": peak_hour[0],
+                "attacks": peak_hour[1]
             }
         else:
-            # Initialize empty but complete hour structure
-            analytics["attacks_by_hour"] = {str(hour): 0 for hour in range(24)}
-            analytics["attacks_by_day"] = {}
             analytics["peak_hour"] = {"hour": 0, "attacks": 0}
-            analytics["attack_intensity"] = {
-                "active_hours": 0,
-                "avg_per_active_hour": 0,
-                "total_attacks_today": 0
-            }
         
-        # Pattern analysis
-        usernames = df['username'].tolist()
-        passwords = df['password'].tolist()
+        # Add attack intensity analysis
+        total_hours_with_attacks = len(hour_buckets)
+        avg_attacks_per_active_hour = sum(hour_buckets.values()) / max(total_hours_with_attacks, 1)
+        
+        analytics["attack_intensity"] = {
+            "active_hours": total_hours_with_attacks,
+            "avg_per_active_hour": round(avg_attacks_per_active_hour, 1),
+            "total_attacks_today": sum(attempt_store.bucket_counts("day", now, now).values())
+        }
         
         # Common username patterns
-        admin_variants = [u for u in usernames if 'admin' in u.lower()]
-        root_variants = [u for u in usernames if 'root' in u.lower()]
-        if admin_variants:
-            analytics["credential_patterns"]["common_username_patterns"].append(f"Admin variants: {len(admin_variants)}")
-        if root_variants:
-            analytics["credential_patterns"]["common_username_patterns"].append(f"Root variants: {len(root_variants)}")
+        if credentials["admin_variants"]:
+            analytics["credential_patterns"]["common_username_patterns"].append(f"Admin variants: {credentials['admin_variants']}")
+        if credentials["root_variants"]:
+            analytics["credential_patterns"]["common_username_patterns"].append(f"Root variants: {credentials['root_variants']}")
         
         # Common password patterns
-        numeric_passwords = [p for p in passwords if p.isdigit()]
-        simple_passwords = [p for p in passwords if p.lower() in ['password', '123456', 'admin', 'qwerty']]
-        if numeric_passwords:
-            analytics["credential_patterns"]["common_password_patterns"].append(f"Numeric only: {len(numeric_passwords)}")
-        if simple_passwords:
-            analytics["credential_patterns"]["common_password_patterns"].append(f"Common weak passwords: {len(simple_passwords)}")
+        if credentials["numeric_passwords"]:
+            analytics["credential_patterns"]["common_password_patterns"].append(f"Numeric only: {credentials['numeric_passwords']}")
+        if credentials["simple_passwords"]:
+            analytics["credential_patterns"]["common_password_patterns"].append(f"Common weak passwords: {credentials['simple_passwords']}")
         
         # Recent attacks (last 10)
-        recent_df = df.tail(10)
-        for _, row in recent_df.iterrows():
-            location = get_ip_location(row['ip'])
+        recent_attempts = attempt_store.recent(10)
+        locations = geo_resolver.resolve_many(attempt['ip'] for attempt in recent_attempts)
+        for attempt in recent_attempts:
+            location = locations[attempt['ip']]
             analytics["recent_attacks"].append({
-                'timestamp': row['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
-                'ip': row['ip'],
-                'username': row['username'],
-                'password': row['password'],
-                'classification': classify_with_model(row['ip'], row['username'], row['password']),
+                'timestamp': str(attempt['timestamp'])[:19],
+                'ip': attempt['ip'],
+                'username': attempt['username'],
+                'password': attempt['password'],
+                'classification': attempt['verdict'],
                 'location': location['country'] if location else 'Unknown'
             })
         
@@ -412,6 +614,7 @@ def get_detailed_analytics():
     except Exception as e:
         app.logger.error(f"Error generating analytics: {e}")
         return {
+            "error": "Analytics are temporarily unavailable",
             "basic_stats": {"total_attempts": 0, "unique_ips": 0, "attacker_count": 0, "success_rate": 0},
             "top_usernames": {}, "top_passwords": {}, "top_attacker_ips": {},
             "attacks_by_hour": {}, "attacks_by_day": {}, "credential_patterns": {},
@@ -421,71 +624,231 @@ def get_detailed_analytics():
 def get_threat_intelligence():
     """Generate threat intelligence report"""
     try:
-        with open(LOG_FILE, "r") as f:
-            reader = csv.reader(f)
-            attacks_by_country = defaultdict(int)
-            repeated_ips = defaultdict(int)
-            
-            for row in reader:
-                if len(row) >= 4:
-                    _, ip, username, password = row
-                    repeated_ips[ip] += 1
-                    
-                    if classify_with_model(ip, username, password) == "attacker":
-                        location = get_ip_location(ip)
-                        if location:
-                            attacks_by_country[location['country']] += 1
+        ensure_live_stats()
+        attacks_by_country = defaultdict(int)
+        # Only the most active attacker IPs are geolocated, so a report costs a bounded number of lookups
+        attacker_ips = live_stats.top_values("attacker_ip", limit=app.config['THREAT_INTEL_IP_LIMIT'])
+        locations = geo_resolver.resolve_many(ip for ip, _ in attacker_ips)
+        for ip, count in attacker_ips:
+            location = locations[ip]
+            if location:
+                attacks_by_country[location['country']] += count
         
         # Find persistent attackers (IPs with multiple attempts)
-        persistent_attackers = {ip: count for ip, count in repeated_ips.items() if count > 1}
+        persistent_attackers = live_stats.top_values("ip", limit=10, min_count=2)
         
         return {
             "attacks_by_country": dict(attacks_by_country),
-            "persistent_attackers": dict(sorted(persistent_attackers.items(), key=lambda x: x[1], reverse=True)[:10]),
+            "persistent_attackers": dict(persistent_attackers),
             "total_countries": len(attacks_by_country),
             "most_active_country": max(attacks_by_country.items(), key=lambda x: x[1])[0] if attacks_by_country else "None"
         }
     except Exception as e:
         app.logger.error(f"Error generating threat intelligence: {e}")
-        return {"attacks_by_country": {}, "persistent_attackers": {}, "total_countries": 0, "most_active_country": "None"}
+        return {"error": "Threat intelligence is temporarily unavailable",
+                "attacks_by_country": {}, "persistent_attackers": {}, "total_countries": 0, "most_active_country": "None"}
+
+def get_recent_attempts(limit=50):
+    """
+    Return (feed sequence, newest attempts with their locations); the live feed
+    continues from that sequence, so no attempt falls between the two
+    """
+    # The live feed ring usually holds them already, so the log is not read at all
+    seq, events = attempt_feed.snapshot(limit)
+    if len(events) >= limit:
+        return seq, events
+    
+    # Read after taking the sequence: an attempt may then be both here and in the feed, but none is missed
+    attempts = []
+    recent_attempts = attempt_store.recent(limit)
+    locations = geo_resolver.resolve_many(attempt['ip'] for attempt in recent_attempts)
+    for attempt in recent_attempts:
+        location = locations[attempt['ip']]
+        attempts.append({
+            'timestamp': attempt['timestamp'],
+            'ip': attempt['ip'],
+            'username': attempt['username'],
+            'password': attempt['password'],
+            'classification': attempt['verdict'],
+            'location': location
+        })
+    
+    return seq, attempts
+
+def ensure_live_stats():
+    """Rebuild the live counters from the attempt store the first time they are needed"""
+    global live_stats_ready
+    if live_stats_ready:
+        return
+    # With writes held off, no batch can land both in the rebuild and in record_many
+    with attempt_writer.paused():
+        if not live_stats_ready:
+            live_stats.rebuild(attempt_store)
+            live_stats_ready = True
+
+# Switching to the SQLite store keeps the CSV history: it is imported once, into an empty database
+if hasattr(attempt_store, "import_csv_log"):
+    imported = attempt_store.import_csv_log(LOG_FILE, app.config['LOG_SEGMENT_DIR'])
+    if imported:
+        app.logger.info(f"Imported {imported} attempts from {LOG_FILE} into {app.config['ATTEMPT_DB_FILE']}")
+        if current_model.watermark is not None and os.path.exists(MODEL_FILE):
+            # The model's watermark is a byte offset into the CSV log, meaningless as an attempt id;
+            # saving it without one makes every worker's next retrain a full refit
+            try:
+                bundle = load_model_bundle(MODEL_FILE)
+                bundle.watermark = None
+                bundle.version += 1
+                save_model_bundle(bundle, MODEL_FILE)
+                current_model = load_serving_bundle(MODEL_FILE)
+                model_file_mtime = model_files_mtime()
+            except Exception as e:
+                app.logger.error(f"Error resetting the model watermark after the import: {e}")
+
+# With FAST_STARTUP, logins are served straight away and the counters (which may
+# mean reading the whole CSV log with pandas) are built on the first analytics call.
+# Shared counters must be ready before this worker records into them.
+if not app.config['FAST_STARTUP'] or SHARED_MODE:
+    ensure_live_stats()
+
+# Dashboard API responses, keyed by request and data version
+response_cache = ResponseCache(max_entries=app.config['RESPONSE_CACHE_SIZE'])
+metrics.callback("honeypot_cache_entries", "Entries held by each in-memory cache", "gauge", lambda: {
+    "geolocation": len(ip_cache),
+    "verdict": len(verdict_cache),
+    "response": response_cache.stats()["entries"]
+}, ["cache"])
+metrics.callback("honeypot_write_queue_depth", "Attempts waiting for the group-commit writer",
+                 "gauge", lambda: attempt_writer.stats()["queue_depth"])
+
+class UncachedResponse(Exception):
+    """Carries a response body out of the response cache without storing it"""
+    
+    def __init__(self, body):
+        super().__init__()
+        self.body = body
+
+def cached_json_response(compute):
+    """
+    Serve compute()'s JSON from the response cache, answering 304 while the data is unchanged.
+    A payload with an "error" key is a fallback after a failure; it is served but never cached.
+    """
+    ensure_live_stats()
+    key = (
+        request.path,
+        tuple(sorted(request.args.items(multi=True))),
+        live_stats.high_water_mark(),
+        current_model.version,
+        # Default ranges and "today" move with the date even without new attempts
+        datetime.now().date().isoformat()
+    )
+    etag = response_cache.etag(key)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        def render():
+            payload = compute()
+            body = app.json.dumps(payload)
+            if isinstance(payload, dict) and "error" in payload:
+                raise UncachedResponse(body)
+            return body
+        
+        try:
+            body = response_cache.get_or_compute(key, render)
+        except UncachedResponse as e:
+            response = app.response_class(e.body, mimetype="application/json")
+            response.headers["Cache-Control"] = "no-store"
+            return response
+        response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Let browsers keep the response but revalidate it on every poll
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 @app.route("/api/stats")
+@api_request_seconds.labels("/api/stats").time()
 def api_stats():
-    stats = get_stats()
-    return jsonify(stats)
+    return cached_json_response(get_stats)
+
+def parse_local_timestamp(value):
+    """Parse an ISO 8601 timestamp into the naive local time the attempt log is written in"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
 
 @app.route("/api/analytics")
+@api_request_seconds.labels("/api/analytics").time()
 def api_analytics():
-    analytics = get_detailed_analytics()
-    return jsonify(analytics)
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in ("minute", "hour", "day"):
+        return jsonify({"error": "granularity must be minute, hour or day"}), 400
+    try:
+        since = parse_local_timestamp(request.args["since"]) if request.args.get("since") else None
+        until = parse_local_timestamp(request.args["until"]) if request.args.get("until") else None
+    except ValueError:
+        return jsonify({"error": "since and until must be ISO 8601 timestamps"}), 400
+    if since is not None and until is not None and since > until:
+        return jsonify({"error": "since must not be after until"}), 400
+    return cached_json_response(lambda: get_detailed_analytics(since, until, granularity))
 
 @app.route("/api/threat-intelligence")
+@api_request_seconds.labels("/api/threat-intelligence").time()
 def api_threat_intelligence():
-    threat_data = get_threat_intelligence()
-    return jsonify(threat_data)
+    return cached_json_response(get_threat_intelligence)
 
 @app.route("/api/recent-attempts")
+@api_request_seconds.labels("/api/recent-attempts").time()
 def api_recent_attempts():
-    attempts = []
-    try:
-        with open(LOG_FILE, "r") as f:
-            lines = f.readlines()
-            for line in lines[-50:]:
-                row = line.strip().split(',')
-                if len(row) >= 4:
-                    timestamp, ip, username, password = row
-                    location = get_ip_location(ip)
-                    attempts.append({
-                        'timestamp': timestamp,
-                        'ip': ip,
-                        'username': username,
-                        'classification': classify_with_model(ip, username, password),
-                        'location': location
-                    })
-    except FileNotFoundError:
-        pass
+    limit = max(1, min(request.args.get("limit", 50, type=int), app.config['LIVE_FEED_SIZE']))
+    # Not response-cached: the ring lookup is cheap, and the cache key could run ahead of the ring
+    seq, attempts = get_recent_attempts(limit)
+    response = jsonify(attempts)
+    # Pass to /api/live-feed?after= to continue from this backfill
+    response.headers["X-Feed-Seq"] = str(seq)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+@app.route("/api/cache-stats")
+@api_request_seconds.labels("/api/cache-stats").time()
+def api_cache_stats():
+    """Hit and miss counters for the verdict and API response caches, and write queue figures"""
+    return jsonify({
+        "verdict_cache": verdict_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "attempt_writer": attempt_writer.stats()
+    })
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Metrics of this worker process in the Prometheus text format"""
+    return app.response_class(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route("/api/live-feed")
+def api_live_feed():
+    """
+    Server-Sent Events stream of attempts as they are logged, starting after
+    the Last-Event-ID of a reconnecting client, else after the ``after``
+    sequence returned with a /api/recent-attempts backfill, else from now
+    """
+    resume_from = request.headers.get("Last-Event-ID", "") or request.args.get("after", "")
+    after = int(resume_from) if resume_from.isdigit() else attempt_feed.last_seq
+    # Resume where the client left off, unless the feed restarted since
+    after = min(after, attempt_feed.last_seq)
+    keepalive = app.config['LIVE_FEED_KEEPALIVE']
+    
+    def stream(after):
+        yield "retry: 3000\n\n"
+        while True:
+            events = attempt_feed.wait(after, timeout=keepalive)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for seq, event in events:
+                yield format_sse(seq, event)
+            after = events[-1][0]
     
-    return jsonify(attempts)
+    return app.response_class(stream(after), mimetype="text/event-stream",
+                              headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route("/", methods=["GET", "POST"])
 def login():
@@ -495,9 +858,9 @@ def login():
         username = request.form.get("username")
         password = request.form.get("password")
 
-        log_attempt(ip, username, password)
+        user_type = classify_attempt(ip, username, password)
 
-        user_type = classify_with_model(ip, username, password)
+        log_attempt(ip, username, password, user_type)
 
         if user_type == "attacker":
             return redirect(url_for("fake_admin_panel"))
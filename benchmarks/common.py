@@ -0,0 +1,123 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Benchmark Helpers
+
+Shared pieces of the benchmark scripts: loading the app in a scratch
+directory with geolocation stubbed out, timing helpers, and writing results
+as JSON tagged with the commit they were measured on.
+"""
+
+import hashlib
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from geolocation import GeoProvider
+
+
+class StubGeoProvider(GeoProvider):
+    """Deterministic offline locations, so benchmarks never touch the network."""
+
+    batch_size = 100
+    COUNTRIES = ["China", "United States", "Russia", "Brazil", "India", "Germany", "Vietnam", "Netherlands"]
+
+    def lookup(self, session, ip):
+        digest = hashlib.blake2b(ip.encode("utf-8"), digest_size=4).digest()
+        return {
+            "lat": digest[0] / 255.0 * 180 - 90,
+            "lon": digest[1] / 255.0 * 360 - 180,
+            "country": self.COUNTRIES[digest[2] % len(self.COUNTRIES)],
+        }
+
+
+def parse_count(text):
+    """Parse a row count such as ``10000``, ``10k`` or ``1M``."""
+    text = str(text).strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def load_app(workdir, store="csv", **env):
+    """
+    Import app.py with ``workdir`` as the working directory and ``env``
+    applied, and replace its geolocation provider with StubGeoProvider.
+    Only one app can be loaded per process, since its settings are read at import.
+    """
+    os.chdir(workdir)
+    os.environ.update({
+        "ATTEMPT_STORE": store,
+        "RETRAIN_THRESHOLD": "1000000000",  # benchmarks retrain explicitly
+        "GEOLOCATION_REQUESTS_PER_MINUTE": "100000000",
+    })
+    os.environ.update({key: str(value) for key, value in env.items()})
+    import app
+    app.geo_resolver.provider = StubGeoProvider()
+    return app
+
+
+def summarize_seconds(samples):
+    """Summary statistics for a list of durations in seconds."""
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "min_seconds": ordered[0],
+        "median_seconds": statistics.median(ordered),
+        "mean_seconds": statistics.fmean(ordered),
+        "p99_seconds": percentile(ordered, 99),
+        "max_seconds": ordered[-1],
+    }
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def time_calls(func, repeat):
+    """Call ``func`` ``repeat`` times and return the duration of each call."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def environment():
+    """Where and on what code the results were measured."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "measured_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(results, output=None):
+    """Print the results as JSON, or write them to ``output``."""
+    results = dict(results, environment=environment())
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Benchmark Comparison
+
+Compares two result files written by the same benchmark script, usually one
+from the base commit and one from a change, and lists each timing,
+throughput and memory measurement side by side. Exits with status 1 when any
+of them got worse by more than ``--threshold``.
+
+Usage: python benchmarks/compare.py base.json change.json [--threshold 0.10]
+"""
+
+import argparse
+import json
+import sys
+
+# Measurement keys where a larger value is better; other compared keys are costs
+HIGHER_IS_BETTER = ("per_second",)
+COMPARED = ("seconds", "_ms", "microseconds", "rss_mb", "per_second", "p50", "p90", "p99", "max")
+# Repeated-call summaries are judged on their median; the extremes are too noisy to gate on
+SKIPPED = (".calls", ".min_seconds", ".mean_seconds", ".p99_seconds", ".max_seconds", ".seconds")
+
+
+def flatten(results, prefix=""):
+    """Map dotted key paths to the numeric leaves of a result file, skipping its environment."""
+    flat = {}
+    for key, value in results.items():
+        if key == "environment":
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compared(path):
+    return any(part in path for part in COMPARED) and not path.endswith(SKIPPED)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("change")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown, e.g. 0.10")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.change) as f:
+        change = json.load(f)
+    if base.get("benchmark") != change.get("benchmark"):
+        sys.exit(f"Results are from different benchmarks: {base.get('benchmark')} and {change.get('benchmark')}")
+
+    old, new = flatten(base), flatten(change)
+    regressions = []
+    print(f"{'measurement':<56} {'base':>14} {'change':>14} {'delta':>8}")
+    for path in sorted(set(old) & set(new)):
+        if not compared(path) or not old[path]:
+            continue
+        delta = (new[path] - old[path]) / old[path]
+        worse = -delta if any(part in path for part in HIGHER_IS_BETTER) else delta
+        flag = " !" if worse > args.threshold else ""
+        if flag:
+            regressions.append(path)
+        print(f"{path:<56} {old[path]:>14.6g} {new[path]:>14.6g} {delta:>+7.1%}{flag}")
+
+    base_commit = base.get("environment", {}).get("commit")
+    change_commit = change.get("environment", {}).get("commit")
+    print(f"\n{base_commit} -> {change_commit}: {len(regressions)} regression(s) over {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Synthetic Attempt Generator
+
+Generates login attempts shaped like honeypot traffic: most attempts come
+from a heavy-tailed pool of attacker IPs trying common usernames and weak
+passwords, and the rest from many normal users with personal usernames and
+longer passwords. Timestamps are spread over the last ``days`` days, oldest
+first, as the app appends them. Output is deterministic for a given seed.
+
+Usage: python benchmarks/generate.py --rows 1M --store csv --output logs.csv
+"""
+
+import argparse
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from common import parse_count, write_results
+
+# (value, weight) pairs, roughly following published honeypot credential lists
+ATTACKER_USERNAMES = [
+    ("root", 40), ("admin", 25), ("user", 6), ("test", 5), ("ubnt", 4), ("oracle", 3), ("guest", 3),
+    ("postgres", 3), ("pi", 2), ("support", 2), ("administrator", 2), ("ftpuser", 2), ("git", 1),
+    ("ubuntu", 1), ("sa", 1),
+]
+ATTACKER_PASSWORDS = [
+    ("123456", 30), ("password", 12), ("admin", 10), ("12345", 8), ("123456789", 6), ("qwerty", 5),
+    ("12345678", 5), ("1234", 4), ("root", 4), ("password123", 3), ("abc123", 3), ("111111", 2),
+    ("admin123", 2), ("letmein", 1), ("default", 1),
+]
+FIRST_NAMES = ["alice", "bob", "carol", "david", "erin", "frank", "grace", "heidi", "ivan", "judy",
+               "mallory", "nina", "oscar", "peggy", "rupert", "sybil", "trent", "victor", "wendy", "zoe"]
+LAST_NAMES = ["smith", "jones", "taylor", "brown", "wilson", "evans", "thomas", "roberts", "walker", "wright"]
+PASSWORD_CHARS = np.array(list("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!@#$%&*-_"))
+
+
+def _weighted(rng, pairs, size):
+    values = np.array([value for value, _ in pairs], dtype=object)
+    weights = np.array([weight for _, weight in pairs], dtype=float)
+    return values[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def _ip_pool(rng, size):
+    octets = rng.integers(1, 255, size=(size, 4))
+    octets[:, 0] = rng.integers(1, 224, size=size)
+    return np.array([".".join(map(str, row)) for row in octets.tolist()], dtype=object)
+
+
+def generate_rows(rows, seed=42, days=30, attacker_share=0.85, end=None, chunk_size=100000):
+    """
+    Yield lists of (timestamp, ip, username, password, verdict) tuples, oldest
+    first, ``chunk_size`` rows at a time. ``verdict`` is the generator's own
+    label, "attacker" or "normal_user".
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now()
+    start = end - timedelta(days=days)
+
+    # A few attacker IPs send most of the traffic (Zipf-like); normal users spread out
+    attacker_ips = _ip_pool(rng, max(10, rows // 200))
+    attacker_weights = 1.0 / np.arange(1, len(attacker_ips) + 1) ** 1.1
+    attacker_weights /= attacker_weights.sum()
+    normal_ips = _ip_pool(rng, max(10, rows // 20))
+
+    span_us = int((end - start).total_seconds() * 1e6)
+    start_us = np.datetime64(start, "us")
+    for offset in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - offset)
+        # Each chunk covers its own slice of the time range, so the output is sorted
+        low = span_us * offset // rows
+        high = span_us * (offset + n) // rows
+        stamps = start_us + np.sort(rng.integers(low, max(high, low + 1), size=n)).astype("timedelta64[us]")
+        timestamps = np.char.replace(np.datetime_as_string(stamps, unit="us"), "T", " ").tolist()
+
+        is_attacker = rng.random(n) < attacker_share
+        attackers = int(is_attacker.sum())
+        normals = n - attackers
+
+        ips = np.empty(n, dtype=object)
+        usernames = np.empty(n, dtype=object)
+        passwords = np.empty(n, dtype=object)
+        ips[is_attacker] = attacker_ips[rng.choice(len(attacker_ips), size=attackers, p=attacker_weights)]
+        usernames[is_attacker] = _weighted(rng, ATTACKER_USERNAMES, attackers)
+        passwords[is_attacker] = _weighted(rng, ATTACKER_PASSWORDS, attackers)
+
+        ips[~is_attacker] = normal_ips[rng.integers(0, len(normal_ips), size=normals)]
+        first = rng.choice(FIRST_NAMES, size=normals)
+        last = rng.choice(LAST_NAMES, size=normals)
+        usernames[~is_attacker] = [f"{a}.{b}" for a, b in zip(first, last)]
+        lengths = rng.integers(10, 17, size=normals)
+        chars = PASSWORD_CHARS[rng.integers(0, len(PASSWORD_CHARS), size=(normals, 16))]
+        passwords[~is_attacker] = ["".join(row[:length]) for row, length in zip(chars.tolist(), lengths)]
+
+        verdicts = np.where(is_attacker, "attacker", "normal_user").tolist()
+        yield list(zip(timestamps, ips.tolist(), usernames.tolist(), passwords.tolist(), verdicts))
+
+
+def write_log(path, store, rows, seed=42, days=30):
+    """Write ``rows`` generated attempts to a CSV log or SQLite attempt database at ``path``."""
+    if store == "csv":
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for chunk in generate_rows(rows, seed=seed, days=days):
+                # The verdict column, as the app writes it
+                writer.writerows(chunk)
+    elif store == "sqlite":
+        from storage import SQLiteAttemptStore
+
+        attempt_store = SQLiteAttemptStore(path)
+        for chunk in generate_rows(rows, seed=seed, days=days):
+            attempt_store.append_many(chunk)
+    else:
+        raise ValueError(f"Unknown attempt store backend: {store}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10k", help="number of attempts, e.g. 10k, 1M or 10M")
+    parser.add_argument("--store", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--output", required=True, help="log file (csv) or database (sqlite) to append to")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=30, help="days of history the attempts cover")
+    parser.add_argument("--results", help="write the JSON summary to this file instead of stdout")
+    args = parser.parse_args()
+
+    rows = parse_count(args.rows)
+    started = time.perf_counter()
+    write_log(args.output, args.store, rows, seed=args.seed, days=args.days)
+    elapsed = time.perf_counter() - started
+    write_results({
+        "benchmark": "generate",
+        "store": args.store,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else None,
+        "bytes": os.path.getsize(args.output),
+    }, args.results)
+
+
+if __name__ == "__main__":
+    main()
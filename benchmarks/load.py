@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Ingest Load Driver
+
+Posts generated login attempts to the honeypot's ``/`` route from several
+threads and reports attempts per second and latency percentiles. By default
+the app runs in-process through the Flask test client, in a scratch
+directory with geolocation stubbed, and every attempt carries its own source
+IP. With ``--url`` a running server is driven over HTTP instead; all
+attempts then come from this machine's address.
+
+Usage: python benchmarks/load.py --requests 20000 --concurrency 8 [--seed-rows 100k]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from common import load_app, parse_count, percentile, write_results
+from generate import generate_rows, write_log
+
+
+def drive(post, attempts, concurrency):
+    """Send ``attempts`` through ``post`` from ``concurrency`` threads; return latencies, statuses and wall time."""
+    latencies = [[] for _ in range(concurrency)]
+    statuses = [{} for _ in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        send = post()
+        barrier.wait()
+        for ip, username, password in attempts[index::concurrency]:
+            started = time.perf_counter()
+            status = send(ip, username, password)
+            latencies[index].append(time.perf_counter() - started)
+            statuses[index][status] = statuses[index].get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged = {}
+    for counts in statuses:
+        for status, count in counts.items():
+            merged[str(status)] = merged.get(str(status), 0) + count
+    return sorted(sum(latencies, [])), merged, elapsed
+
+
+def test_client_poster(app_module):
+    def make():
+        client = app_module.app.test_client()
+
+        def send(ip, username, password):
+            response = client.post("/", data={"username": username, "password": password},
+                                   environ_base={"REMOTE_ADDR": ip})
+            return response.status_code
+        return send
+    return make
+
+
+def http_poster(url):
+    import requests
+
+    def make():
+        session = requests.Session()
+
+        def send(ip, username, password):
+            return session.post(url, data={"username": username, "password": password},
+                                allow_redirects=False).status_code
+        return send
+    return make
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", default="10k", help="number of login attempts to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads")
+    parser.add_argument("--seed-rows", default="0", help="attempts already in the log before the run")
+    parser.add_argument("--store", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--url", help="drive a running server at this URL instead of an in-process app")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    total = parse_count(args.requests)
+    attempts = [row[1:4] for chunk in generate_rows(total, seed=args.seed) for row in chunk]
+    results = {"benchmark": "load", "requests": total, "concurrency": args.concurrency}
+
+    if args.url:
+        results["target"] = args.url
+        latencies, statuses, elapsed = drive(http_poster(args.url), attempts, args.concurrency)
+        drain_seconds = None
+        writer_stats = None
+    else:
+        workdir = tempfile.mkdtemp(prefix="honeypot-load-")
+        seed_rows = parse_count(args.seed_rows)
+        if seed_rows:
+            write_log(os.path.join(workdir, "logs.csv" if args.store == "csv" else "attempts.db"),
+                      args.store, seed_rows)
+        app_module = load_app(workdir, args.store, LOG_FILE="logs.csv", ATTEMPT_DB_FILE="attempts.db")
+        if seed_rows:
+            app_module.retrain_model()
+        results.update({"target": "test_client", "store": args.store, "seed_rows": seed_rows})
+        latencies, statuses, elapsed = drive(test_client_poster(app_module), attempts, args.concurrency)
+        # Time until the group-commit writer has persisted everything that was accepted
+        started = time.perf_counter()
+        app_module.attempt_writer.flush()
+        drain_seconds = time.perf_counter() - started
+        writer_stats = app_module.attempt_writer.stats()
+
+    results.update({
+        "seconds": elapsed,
+        "attempts_per_second": total / elapsed if elapsed else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000,
+        },
+        "statuses": statuses,
+        "writer_drain_seconds": drain_seconds,
+        "writer": writer_stats,
+    })
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Microbenchmarks
+
+Times the app's hot functions against a generated attempt log: the
+dashboard data functions (called directly, so the response cache is not
+involved), single-attempt classification with a cold and a warm verdict
+cache, and a full retrain. The first call of each dashboard function is
+reported separately as ``cold_seconds``.
+
+Usage: python benchmarks/micro.py --rows 100k --store sqlite [--repeat 5]
+"""
+
+import argparse
+import os
+import tempfile
+
+from common import load_app, parse_count, summarize_seconds, time_calls, write_results
+from generate import generate_rows, write_log
+
+
+def dashboard_benchmark(func, repeat):
+    samples = time_calls(func, repeat + 1)
+    return dict(summarize_seconds(samples[1:]), cold_seconds=samples[0])
+
+
+def classify_benchmark(app_module, attempts, warm):
+    """Per-call timings of classify_with_model over ``attempts``."""
+    def run():
+        for ip, username, password, velocity, distinct in attempts:
+            app_module.classify_with_model(ip, username, password, velocity, distinct)
+
+    app_module.verdict_cache.clear()
+    if warm:
+        run()
+    samples = time_calls(run, 1)
+    return {
+        "calls": len(attempts),
+        "seconds": samples[0],
+        "microseconds_per_call": samples[0] / len(attempts) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="100k", help="attempts in the generated log")
+    parser.add_argument("--store", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--repeat", type=int, default=5, help="warm calls per dashboard function")
+    parser.add_argument("--retrain-repeat", type=int, default=3, help="full retrains to time")
+    parser.add_argument("--classify-calls", type=int, default=10000)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    rows = parse_count(args.rows)
+    workdir = tempfile.mkdtemp(prefix="honeypot-micro-")
+    write_log(os.path.join(workdir, "logs.csv" if args.store == "csv" else "attempts.db"), args.store, rows)
+    app_module = load_app(workdir, args.store, LOG_FILE="logs.csv", ATTEMPT_DB_FILE="attempts.db",
+                          RETRAIN_MODE="full")
+
+    results = {"benchmark": "micro", "store": args.store, "rows": rows}
+    # Retrain first, so the classification benchmarks use a trained model
+    results["retrain_model"] = summarize_seconds(time_calls(app_module.retrain_model, args.retrain_repeat))
+
+    # Distinct attempts with a spread of per-IP velocities, as the login route would pass them
+    attempts = [
+        (ip, username, password, 1 + i % 50, 1 + i % 5)
+        for chunk in generate_rows(args.classify_calls, seed=11)
+        for i, (_, ip, username, password, _) in enumerate(chunk)
+    ]
+    results["classify_with_model_uncached"] = classify_benchmark(app_module, attempts, warm=False)
+    results["classify_with_model_cached"] = classify_benchmark(app_module, attempts, warm=True)
+
+    results["get_stats"] = dashboard_benchmark(app_module.get_stats, args.repeat)
+    results["get_detailed_analytics"] = dashboard_benchmark(app_module.get_detailed_analytics, args.repeat)
+    results["get_threat_intelligence"] = dashboard_benchmark(app_module.get_threat_intelligence, args.repeat)
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Startup Benchmark
+
+Measures how long a fresh worker takes to import app.py and serve its first
+login, its peak memory, and which heavy modules were loaded by then, with
+FAST_STARTUP on and off. Each run is a new interpreter in a scratch directory
+seeded with a generated log, a trained model and a geolocation cache, so
+nothing is warm. Results are printed (or written) as JSON.
+
+Usage: python benchmarks/startup.py [--rows 100k] [--runs 5] [--output startup.json]
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT, StubGeoProvider, parse_count, write_results
+from generate import generate_rows
+
+HEAVY_MODULES = ("pandas", "sklearn", "joblib", "requests")
+
+# Runs in the child interpreter; prints one JSON object
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+
+def peak_rss_mb():
+    # ru_maxrss can include the parent's memory from before exec on Linux, so prefer VmHWM
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.post("/", data={{"username": "admin", "password": "123456"}})
+logged_in = time.perf_counter()
+rss_login = peak_rss_mb()
+loaded = [name for name in {heavy!r} if name in sys.modules]
+client.get("/api/stats")
+analytics = time.perf_counter()
+app.attempt_writer.flush()
+print(json.dumps({{
+    "import_seconds": imported - started,
+    "first_login_seconds": logged_in - imported,
+    "first_stats_seconds": analytics - logged_in,
+    "max_rss_mb_at_first_login": rss_login,
+    "max_rss_mb": peak_rss_mb(),
+    "heavy_modules_at_first_login": loaded,
+}}))
+"""
+
+
+def seed_directory(path, rows):
+    """Write logs.csv, ip_cache.json and a trained model into ``path``; return the number of IPs."""
+    ips = set()
+    with open(os.path.join(path, "logs.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        # setup.py reads the log with a header row; the app skips it
+        writer.writerow(["timestamp", "ip", "username", "password", "classification"])
+        for chunk in generate_rows(rows):
+            writer.writerows(chunk)
+            ips.update(row[1] for row in chunk)
+    provider = StubGeoProvider()
+    with open(os.path.join(path, "ip_cache.json"), "w") as f:
+        json.dump({ip: provider.lookup(None, ip) for ip in ips}, f)
+
+    import setup
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup.create_initial_model()
+    finally:
+        os.chdir(cwd)
+    return len(ips)
+
+
+def run_once(seed_dir, fast_startup):
+    """Copy the seeded files to a scratch directory and measure one cold start there."""
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in os.listdir(seed_dir):
+            with open(os.path.join(seed_dir, name), "rb") as src, open(os.path.join(workdir, name), "wb") as dst:
+                dst.write(src.read())
+        env = dict(os.environ, FAST_STARTUP="true" if fast_startup else "false",
+                   GEOLOCATION_API_URL="http://127.0.0.1:9/json/", GEOLOCATION_BATCH_URL="http://127.0.0.1:9/batch")
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD.format(root=ROOT, heavy=HEAVY_MODULES)],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    """Median of each numeric measurement across runs."""
+    summary = {
+        key: statistics.median(run[key] for run in runs)
+        for key, value in runs[0].items() if isinstance(value, (int, float))
+    }
+    summary["heavy_modules_at_first_login"] = runs[-1]["heavy_modules_at_first_login"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="100k", help="attempts in the seeded log")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per mode")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    rows = parse_count(args.rows)
+    with tempfile.TemporaryDirectory() as seed_dir:
+        ips = seed_directory(seed_dir, rows)
+        results = {
+            "benchmark": "startup",
+            "rows": rows,
+            "ips": ips,
+            "runs": args.runs,
+            "modes": {
+                mode: summarize([run_once(seed_dir, mode == "fast") for _ in range(args.runs)])
+                for mode in ("fast", "default")
+            },
+        }
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Model Management Module
+
+Versioned model bundles and the background retraining worker. A bundle holds
+the model, scaler and attacker cluster that must always be used together, and
+the app swaps whole bundles so classification never sees a half-updated pair.
+Verdicts are memoized per model version, since attack traffic repeats the
+same feature vectors over and over.
+
+Every saved model also gets a small .npz centroid artifact next to it, which
+is all the request path needs: classifying is a NumPy distance and argmin,
+without sklearn's input validation or unpickling the model.
+"""
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from features import FEATURE_NAMES, FEATURE_SCHEMA_VERSION, FeatureSchemaError, check_feature_schema
+
+# Used while no trained model is available
+FALLBACK_USERNAMES = frozenset({"admin", "administrator", "root", "sa"})
+FALLBACK_PASSWORDS = frozenset({"password", "123456", "admin"})
+
+
+class CentroidClassifier:
+    """
+    Nearest-centroid equivalent of ``scaler.transform`` followed by
+    ``KMeans.predict``.
+
+    The scaler is folded into the centroids: they are stored in raw feature
+    space, and each feature's squared difference is weighted by the square of
+    the factor the scaler multiplies it by (1 / scale**2 for StandardScaler),
+    which gives the same distances as the scaled space.
+    """
+
+    __slots__ = ('centers', 'weights', 'attacker_cluster', '_weighted_centers', '_center_norms')
+
+    def __init__(self, centers, weights, attacker_cluster):
+        self.centers = np.asarray(centers, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.attacker_cluster = int(attacker_cluster)
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2 in the weighted norm; |x|^2 never changes the argmin
+        self._weighted_centers = self.centers * self.weights
+        self._center_norms = np.sum(self.centers * self._weighted_centers, axis=1)
+
+    @classmethod
+    def from_model(cls, model, scaler, attacker_cluster):
+        """
+        Fold a fitted KMeans-style model and its optional per-feature scaler
+        (StandardScaler, RobustScaler or MinMaxScaler) into centroids.
+        """
+        centers = np.asarray(model.cluster_centers_, dtype=float)
+        weights = np.ones(centers.shape[1])
+        if scaler is not None:
+            centers = scaler.inverse_transform(centers)
+            # Each feature is scaled as a * x + b; a unit step in one feature measures its a
+            n_features = centers.shape[1]
+            origin = scaler.transform(np.zeros((1, n_features)))
+            weights = np.square(np.diag(scaler.transform(np.eye(n_features)) - origin))
+        return cls(centers, weights, attacker_cluster)
+
+    def predict(self, X):
+        """Return the nearest cluster for each row of ``X``."""
+        return np.argmin(self._center_norms - 2.0 * (X @ self._weighted_centers.T), axis=1)
+
+    def is_attacker(self, X):
+        """Return a boolean array marking the rows of ``X`` in the attacker cluster."""
+        return self.predict(X) == self.attacker_cluster
+
+
+class ModelBundle:
+    """
+    Immutable snapshot of a trained classifier.
+
+    Readers take a reference to the current bundle once and use only that
+    reference, so replacing the module-level bundle is an atomic swap.
+    A bundle loaded from a centroid artifact has ``centroids`` but no
+    ``model``; that is enough to classify but not to update incrementally.
+    """
+
+    __slots__ = ('model', 'scaler', 'attacker_cluster', 'feature_names', 'version', 'watermark',
+                 'feature_schema_version', 'centroids')
+
+    def __init__(self, model, scaler=None, attacker_cluster=1, feature_names=None, version=0,
+                 watermark=None, feature_schema_version=FEATURE_SCHEMA_VERSION, centroids=None):
+        # ``model`` is None until a model has been trained
+        self.model = model
+        self.scaler = scaler
+        self.attacker_cluster = attacker_cluster
+        self.feature_names = feature_names or list(FEATURE_NAMES)
+        self.version = version
+        # Attempt store position of the last row the model was trained on
+        self.watermark = watermark
+        self.feature_schema_version = feature_schema_version
+        if centroids is None and hasattr(model, 'cluster_centers_'):
+            centroids = CentroidClassifier.from_model(model, scaler, attacker_cluster)
+        self.centroids = centroids
+
+    @property
+    def is_trained(self):
+        return self.model is not None or self.centroids is not None
+
+    def is_attacker(self, X):
+        """Return a boolean array marking the rows of the feature matrix ``X`` classified as attackers."""
+        if self.centroids is not None:
+            return self.centroids.is_attacker(X)
+        # Models without centroids go through sklearn
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        return self.model.predict(X) == self.attacker_cluster
+
+    def to_artifact(self):
+        """Return the dict stored in the model file."""
+        return {
+            'model': self.model,
+            'scaler': self.scaler,
+            'feature_names': self.feature_names,
+            'n_clusters': getattr(self.model, 'n_clusters', None),
+            'attacker_cluster': self.attacker_cluster,
+            'model_version': self.version,
+            'watermark': self.watermark,
+            'feature_schema_version': self.feature_schema_version
+        }
+
+
+def load_model_bundle(path):
+    """
+    Load a model file written by any of the training paths, raising
+    FeatureSchemaError if it was trained on a different feature schema.
+    """
+    import joblib
+
+    model_data = joblib.load(path)
+    if not isinstance(model_data, dict):
+        # Old simple model format, which records no feature names
+        model_data = {'model': model_data, 'attacker_cluster': 1, 'feature_names': FEATURE_NAMES}
+
+    feature_names = model_data.get('feature_names') or []
+    # Files written before the schema was versioned used the version 1 features
+    check_feature_schema(feature_names, model_data.get('feature_schema_version', 1))
+    model = model_data['model']
+    n_features = getattr(model_data.get('scaler') or model, 'n_features_in_', len(FEATURE_NAMES))
+    if n_features != len(FEATURE_NAMES):
+        raise FeatureSchemaError(f"model expects {n_features} features, not {len(FEATURE_NAMES)}")
+
+    # Older enhanced files predate the stored attacker cluster
+    return ModelBundle(
+        model,
+        scaler=model_data.get('scaler'),
+        attacker_cluster=model_data.get('attacker_cluster', 2),
+        feature_names=list(feature_names),
+        version=model_data.get('model_version', 0),
+        watermark=model_data.get('watermark')
+    )
+
+
+def centroid_artifact_path(path):
+    """Return the path of the centroid artifact saved alongside model file ``path``."""
+    return f"{os.path.splitext(path)[0]}.npz"
+
+
+def load_centroid_bundle(path):
+    """
+    Load a centroid artifact as a bundle that can classify but has no
+    sklearn model, raising FeatureSchemaError on a schema mismatch.
+    """
+    with np.load(path, allow_pickle=False) as artifact:
+        feature_names = artifact['feature_names'].tolist()
+        check_feature_schema(feature_names, int(artifact['feature_schema_version']))
+        centroids = CentroidClassifier(artifact['centers'], artifact['weights'],
+                                       int(artifact['attacker_cluster']))
+        watermark = int(artifact['watermark']) if 'watermark' in artifact.files else None
+        return ModelBundle(
+            None,
+            attacker_cluster=centroids.attacker_cluster,
+            feature_names=feature_names,
+            version=int(artifact['model_version']),
+            watermark=watermark,
+            centroids=centroids
+        )
+
+
+def saved_model_version(path):
+    """
+    Return the version of the model saved at model file ``path`` or its
+    centroid artifact (0 if neither exists). The feature schema is not
+    checked, so a retrain can supersede a rejected model with a newer version.
+    """
+    versions = [0]
+    artifact_path = centroid_artifact_path(path)
+    if os.path.exists(artifact_path):
+        with np.load(artifact_path, allow_pickle=False) as artifact:
+            versions.append(int(artifact['model_version']))
+    if os.path.exists(path):
+        import joblib
+
+        model_data = joblib.load(path)
+        if isinstance(model_data, dict):
+            versions.append(int(model_data.get('model_version', 0)))
+    return max(versions)
+
+
+def load_serving_bundle(path):
+    """
+    Load the bundle to classify with for model file ``path``: its centroid
+    artifact when that is at least as new as the model file, so joblib is
+    only needed for models saved without one.
+    """
+    artifact_path = centroid_artifact_path(path)
+    if os.path.exists(artifact_path) and (
+            not os.path.exists(path) or os.stat(artifact_path).st_mtime_ns >= os.stat(path).st_mtime_ns):
+        return load_centroid_bundle(artifact_path)
+    return load_model_bundle(path)
+
+
+def save_model_bundle(bundle, path):
+    """
+    Write ``bundle`` to ``path`` and its centroid artifact alongside,
+    each atomically so readers never see a partial file. The artifact is
+    written last, so it is never older than the model it came from.
+    """
+    import joblib
+
+    tmp_path = f"{path}.tmp"
+    joblib.dump(bundle.to_artifact(), tmp_path)
+    os.replace(tmp_path, path)
+
+    if bundle.centroids is None:
+        return
+    artifact = {
+        'centers': bundle.centroids.centers,
+        'weights': bundle.centroids.weights,
+        'attacker_cluster': bundle.centroids.attacker_cluster,
+        'feature_names': np.array(bundle.feature_names),
+        'feature_schema_version': bundle.feature_schema_version,
+        'model_version': bundle.version
+    }
+    if bundle.watermark is not None:
+        artifact['watermark'] = bundle.watermark
+    artifact_path = centroid_artifact_path(path)
+    tmp_path = f"{artifact_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **artifact)
+    os.replace(tmp_path, artifact_path)
+
+
+def select_attacker_cluster(X, labels, n_clusters):
+    """
+    Pick the cluster with the highest rate of common usernames and weak
+    passwords, the same heuristic used by retrain_model.py.
+    """
+    attacker_cluster = 0
+    max_attacker_score = -1.0
+    for i in range(n_clusters):
+        cluster_data = X[labels == i]
+        if len(cluster_data) == 0:
+            continue
+        attacker_score = np.mean(cluster_data[:, 3]) + np.mean(cluster_data[:, 4])
+        if attacker_score > max_attacker_score:
+            max_attacker_score = attacker_score
+            attacker_cluster = i
+    return attacker_cluster
+
+
+def attacker_cluster_from_centers(raw_centers):
+    """
+    Pick the attacker cluster from unscaled centroids. Each centroid is the
+    mean of its members, so columns 3 and 4 are the common username and weak
+    password rates used by select_attacker_cluster.
+    """
+    return int(np.argmax(raw_centers[:, 3] + raw_centers[:, 4]))
+
+
+def partial_fit_bundle(bundle, X_new, version, watermark):
+    """
+    Return a new bundle updated with only the rows in ``X_new``.
+
+    The scaler's running statistics are updated first, and the existing
+    centroids are mapped into the new scaled space before the model's
+    ``partial_fit`` step, so earlier training is carried over. ``bundle`` is
+    left untouched.
+    """
+    scaler = copy.deepcopy(bundle.scaler)
+    model = copy.deepcopy(bundle.model)
+
+    raw_centers = bundle.scaler.inverse_transform(model.cluster_centers_)
+    scaler.partial_fit(X_new)
+    model.cluster_centers_ = np.ascontiguousarray(scaler.transform(raw_centers))
+    model.partial_fit(scaler.transform(X_new))
+
+    attacker_cluster = attacker_cluster_from_centers(scaler.inverse_transform(model.cluster_centers_))
+    return ModelBundle(model, scaler, attacker_cluster, bundle.feature_names, version, watermark,
+                       bundle.feature_schema_version)
+
+
+def heuristic_verdict(username, password):
+    """Classify one attempt by credentials alone, for use without a trained model."""
+    if username.lower() in FALLBACK_USERNAMES or password.lower() in FALLBACK_PASSWORDS:
+        return "attacker"
+    return "normal_user"
+
+
+def heuristic_verdicts(df):
+    """Vectorized heuristic_verdict over a DataFrame's username and password columns."""
+    is_attacker = (df['username'].astype(str).str.lower().isin(FALLBACK_USERNAMES) |
+                   df['password'].astype(str).str.lower().isin(FALLBACK_PASSWORDS))
+    return np.where(is_attacker.to_numpy(), "attacker", "normal_user").astype(object)
+
+
+class VerdictCache:
+    """
+    LRU cache of verdicts keyed by feature vector bytes, for one model version.
+
+    Every lookup names the model version it classifies with; the first
+    lookup for a new version empties the cache, so verdicts from an older
+    model are never returned.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _use_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get_many(self, version, keys):
+        """Return the cached verdict for each key, or None where there is none."""
+        with self._lock:
+            self._use_version(version)
+            verdicts = []
+            for key in keys:
+                verdict = self._entries.get(key)
+                if verdict is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                verdicts.append(verdict)
+            return verdicts
+
+    def put_many(self, version, items):
+        """Store (key, verdict) pairs computed with model ``version``."""
+        with self._lock:
+            self._use_version(version)
+            for key, verdict in items:
+                self._entries[key] = verdict
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, version, key):
+        return self.get_many(version, [key])[0]
+
+    def put(self, version, key, verdict):
+        self.put_many(version, [(key, verdict)])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "model_version": self.version
+            }
+
+
+class RetrainWorker:
+    """
+    Runs retraining on a single background thread.
+
+    ``request`` only flags that a retrain is wanted. Requests that arrive
+    while a fit is running are coalesced into one follow-up run.
+    """
+
+    def __init__(self, train, logger=None):
+        self.train = train
+        self.logger = logger
+        self.runs = 0
+        self._pending = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def request(self):
+        """Ask for a retrain, starting the worker thread on first use."""
+        self._pending.set()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="retrain-worker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            try:
+                self.train()
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Background retraining failed: {e}")
+            self.runs += 1
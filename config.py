@@ -29,21 +29,75 @@ class Config:
     MODEL_FILE = os.environ.get('MODEL_FILE', 'honeypot_model.pkl')
     IP_CACHE_FILE = os.environ.get('IP_CACHE_FILE', 'ip_cache.json')
     
+    # Geolocation Cache Configuration
+    GEO_CACHE_JOURNAL = os.environ.get('GEO_CACHE_JOURNAL', 'ip_cache.journal')
+    GEO_CACHE_MAX_ENTRIES = int(os.environ.get('GEO_CACHE_MAX_ENTRIES', '100000'))
+    GEO_CACHE_TTL = int(os.environ.get('GEO_CACHE_TTL', str(30 * 24 * 3600)))  # seconds
+    GEO_CACHE_NEGATIVE_TTL = int(os.environ.get('GEO_CACHE_NEGATIVE_TTL', '3600'))  # seconds
+    GEO_CACHE_FLUSH_INTERVAL = float(os.environ.get('GEO_CACHE_FLUSH_INTERVAL', '5'))  # seconds
+    
+    # Attempt Storage Configuration
+    ATTEMPT_STORE = os.environ.get('ATTEMPT_STORE', 'csv')  # csv or sqlite
+    ATTEMPT_DB_FILE = os.environ.get('ATTEMPT_DB_FILE', 'attempts.db')
+    WRITE_QUEUE_SIZE = int(os.environ.get('WRITE_QUEUE_SIZE', '10000'))  # 0 = write synchronously
+    WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', '500'))
+    WRITE_FLUSH_INTERVAL = float(os.environ.get('WRITE_FLUSH_INTERVAL', '0.2'))  # seconds
+    WRITE_FSYNC = os.environ.get('WRITE_FSYNC', 'interval')  # none, interval or batch
+    WRITE_FSYNC_INTERVAL = float(os.environ.get('WRITE_FSYNC_INTERVAL', '1.0'))  # seconds
+    LOG_SEGMENT_DIR = os.environ.get('LOG_SEGMENT_DIR', 'log_segments')
+    LOG_SEGMENT_MAX_BYTES = int(os.environ.get('LOG_SEGMENT_MAX_BYTES', str(16 * 1024 * 1024)))  # 0 = never rotate
+    
+    # Analytics Configuration
+    ROLLUP_MINUTE_RETENTION_DAYS = int(os.environ.get('ROLLUP_MINUTE_RETENTION_DAYS', '7'))
+    ANALYTICS_WINDOW_DAYS = int(os.environ.get('ANALYTICS_WINDOW_DAYS', '7'))  # default /api/analytics range
+    TOP_K_ERROR = float(os.environ.get('TOP_K_ERROR', '0.001'))  # max top-K overcount, as a share of attempts
+    THREAT_INTEL_IP_LIMIT = int(os.environ.get('THREAT_INTEL_IP_LIMIT', '500'))  # top attacker IPs geolocated
+    UNIQUE_IPS_EXACT = os.environ.get('UNIQUE_IPS_EXACT', 'False').lower() == 'true'
+    UNIQUE_IP_SKETCH_PRECISION = int(os.environ.get('UNIQUE_IP_SKETCH_PRECISION', '12'))  # 2**p bytes per sketch
+    UNIQUE_IP_HOURLY_RETENTION_DAYS = int(os.environ.get('UNIQUE_IP_HOURLY_RETENTION_DAYS', '7'))
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '128'))  # cached API responses
+    
+    # Live Feed Configuration
+    LIVE_FEED_SIZE = int(os.environ.get('LIVE_FEED_SIZE', '500'))  # attempts kept for backfill
+    LIVE_FEED_KEEPALIVE = float(os.environ.get('LIVE_FEED_KEEPALIVE', '15'))  # seconds
+    LIVE_FEED_POLL_INTERVAL = float(os.environ.get('LIVE_FEED_POLL_INTERVAL', '0.5'))  # seconds, shared mode
+    
+    # Multi-Worker Configuration
+    WORKER_MODE = os.environ.get('WORKER_MODE', 'single')  # single or shared
+    SHARED_STATE_DB = os.environ.get('SHARED_STATE_DB', 'shared_state.db')
+    TRAINER_LOCK_FILE = os.environ.get('TRAINER_LOCK_FILE', 'trainer.lock')
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', '5'))  # seconds
+    
     # Machine Learning Configuration
     RETRAIN_THRESHOLD = int(os.environ.get('RETRAIN_THRESHOLD', '10'))
+    RETRAIN_MODE = os.environ.get('RETRAIN_MODE', 'full')  # full or incremental
+    FULL_REFIT_INTERVAL = int(os.environ.get('FULL_REFIT_INTERVAL', '20'))
+    BRUTE_FORCE_THRESHOLD = int(os.environ.get('BRUTE_FORCE_THRESHOLD', '60'))  # attempts per minute, 0 = off
+    VELOCITY_TRACKER_MAX_IPS = int(os.environ.get('VELOCITY_TRACKER_MAX_IPS', '100000'))
+    VERDICT_CACHE_SIZE = int(os.environ.get('VERDICT_CACHE_SIZE', '100000'))  # memoized verdicts
+    TRAINING_CHUNK_SIZE = int(os.environ.get('TRAINING_CHUNK_SIZE', '100000'))  # rows, retrain_model.py
+    SILHOUETTE_SAMPLE_SIZE = int(os.environ.get('SILHOUETTE_SAMPLE_SIZE', '10000'))  # rows, retrain_model.py
     
     # Server Configuration
     DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
     HOST = os.environ.get('HOST', '127.0.0.1')  # More secure default
     PORT = int(os.environ.get('PORT', '5000'))
+    FAST_STARTUP = os.environ.get('FAST_STARTUP', 'False').lower() == 'true'  # defer analytics state
     
     # API Configuration
-    GEOLOCATION_API_URL = "http://ip-api.com/json/"
-    REQUEST_TIMEOUT = 5  # seconds
+    GEOLOCATION_API_URL = os.environ.get('GEOLOCATION_API_URL', 'http://ip-api.com/json/')
+    GEOLOCATION_BATCH_URL = os.environ.get('GEOLOCATION_BATCH_URL', 'http://ip-api.com/batch')
+    GEOLOCATION_REQUESTS_PER_MINUTE = int(os.environ.get('GEOLOCATION_REQUESTS_PER_MINUTE', '15'))
+    GEOLOCATION_WORKERS = int(os.environ.get('GEOLOCATION_WORKERS', '4'))
+    REQUEST_TIMEOUT = int(os.environ.get('REQUEST_TIMEOUT', '5'))  # seconds
+    
+    # Offline Geolocation Configuration
+    GEOIP_RANGES_CSV = os.environ.get('GEOIP_RANGES_CSV', '')  # start_ip,end_ip,country,lat,lon
+    GEOIP_DB_FILE = os.environ.get('GEOIP_DB_FILE', 'geoip_ranges.bin')
     
     # Logging Configuration
-    LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
-    LOG_BACKUP_COUNT = 10
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))  # 10MB
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '10'))
     
     @classmethod
     def validate_config(cls):
@@ -0,0 +1,176 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Feature Extraction Module
+
+The one feature pipeline shared by the app, setup.py and retrain_model.py.
+Models record the FEATURE_SCHEMA_VERSION they were trained with, and a model
+built from a different schema is rejected when it is loaded rather than
+failing on every classification.
+
+Besides the credential and IP features, each attempt carries its IP's
+activity over the preceding minute: how many attempts it made and how many
+distinct usernames it tried.
+"""
+
+import numpy as np
+
+# Bump whenever a feature is added, removed, reordered or computed differently
+FEATURE_SCHEMA_VERSION = 2
+
+FEATURE_NAMES = [
+    'username_length', 'password_length', 'ip_score',
+    'username_is_common', 'password_is_weak', 'ip_entropy',
+    'ip_velocity', 'ip_distinct_usernames'
+]
+
+# The per-IP activity features cover this many seconds up to the attempt
+VELOCITY_WINDOW_SECONDS = 60
+# Distinct usernames per IP are counted up to this many
+MAX_TRACKED_USERNAMES = 64
+
+COMMON_USERNAMES = frozenset({"admin", "administrator", "root", "sa", "oracle", "test", "guest", "user"})
+WEAK_PASSWORDS = frozenset({"password", "123456", "admin", "password123", "12345", "qwerty", "abc123"})
+
+
+class FeatureSchemaError(ValueError):
+    """Raised when a model was trained on a different feature schema."""
+
+
+def check_feature_schema(feature_names, schema_version):
+    """Raise FeatureSchemaError unless the given schema matches this module's."""
+    if list(feature_names) != FEATURE_NAMES:
+        raise FeatureSchemaError(
+            f"model features {list(feature_names)} do not match {FEATURE_NAMES}"
+        )
+    if schema_version != FEATURE_SCHEMA_VERSION:
+        raise FeatureSchemaError(
+            f"model feature schema v{schema_version} does not match v{FEATURE_SCHEMA_VERSION}"
+        )
+
+
+def extract_features(ip, username, password, velocity=1, distinct_usernames=1):
+    """
+    Return the feature values for one attempt as a list, in FEATURE_NAMES
+    order. ``velocity`` and ``distinct_usernames`` describe the IP's activity
+    over the last VELOCITY_WINDOW_SECONDS, including this attempt.
+    """
+    ip_parts = ip.split('.')
+    return [
+        len(username),
+        len(password),
+        sum(int(part) for part in ip_parts if part.isdigit()),
+        1 if username.lower() in COMMON_USERNAMES else 0,
+        1 if password.lower() in WEAK_PASSWORDS else 0,
+        len(set(ip_parts)) / 4.0,  # Diversity of IP octets
+        velocity,
+        min(distinct_usernames, MAX_TRACKED_USERNAMES)
+    ]
+
+
+def extract_features_row(ip, username, password, velocity=1, distinct_usernames=1):
+    """Return the features for one attempt as a 1 x n array, ready for a model."""
+    return np.array([extract_features(ip, username, password, velocity, distinct_usernames)], dtype=float)
+
+
+def window_activity(ip_codes, seconds, username_codes, window=VELOCITY_WINDOW_SECONDS):
+    """
+    Return (attempts, distinct usernames) arrays giving, for every attempt,
+    the same IP's activity in the ``window`` seconds up to and including it.
+    """
+    order = np.lexsort((seconds, ip_codes))
+    ips = ip_codes[order].tolist()
+    times = seconds[order].tolist()
+    users = username_codes[order].tolist()
+
+    attempts = np.empty(len(order))
+    distinct = np.empty(len(order))
+    start = 0
+    in_window = {}  # username code -> attempts in the window
+    for i in range(len(order)):
+        if i and ips[i] != ips[i - 1]:
+            start = i
+            in_window.clear()
+        while times[start] <= times[i] - window:
+            user = users[start]
+            in_window[user] -= 1
+            if not in_window[user]:
+                del in_window[user]
+            start += 1
+        in_window[users[i]] = in_window.get(users[i], 0) + 1
+        attempts[i] = i - start + 1
+        distinct[i] = len(in_window)
+
+    result_attempts = np.empty(len(order))
+    result_distinct = np.empty(len(order))
+    result_attempts[order] = attempts
+    result_distinct[order] = distinct
+    return result_attempts, result_distinct
+
+
+def extract_features_frame(df):
+    """Return the features for every row of a DataFrame with ip, username and password columns."""
+    import pandas as pd
+
+    # Attack logs repeat the same values heavily, so work on distinct values only
+    username_codes, usernames = pd.factorize(df['username'].astype(str))
+    password_codes, passwords = pd.factorize(df['password'].astype(str))
+    ip_codes, ips = pd.factorize(df['ip'].astype(str))
+    usernames = pd.Series(usernames)
+    passwords = pd.Series(passwords)
+
+    # Split every IP into octet columns once; short IPs leave trailing NaN
+    ip_parts = pd.Series(ips).str.split('.', expand=True)
+    octets = [ip_parts[col] for col in ip_parts.columns]
+
+    ip_score = np.zeros(len(ips))
+    distinct_parts = np.zeros(len(ips))
+    for i, part in enumerate(octets):
+        is_digit = part.str.isdigit().fillna(False).to_numpy(dtype=bool)
+        ip_score += pd.to_numeric(part.where(is_digit), errors='coerce').fillna(0).to_numpy()
+
+        # Count each part once, the first time its value appears in the IP
+        is_new = part.notna().to_numpy(dtype=bool)
+        for previous in octets[:i]:
+            is_new &= (part != previous).to_numpy(dtype=bool)
+        distinct_parts += is_new
+
+    # Per-IP activity, from the attempts in the frame itself
+    if 'timestamp' in df.columns and len(df):
+        times = pd.to_datetime(df['timestamp'], format='ISO8601', errors='coerce')
+        seconds = ((times - pd.Timestamp(0)) / pd.Timedelta(seconds=1)).fillna(0).to_numpy(dtype=float)
+        velocity, distinct_usernames = window_activity(ip_codes, seconds, username_codes)
+    else:
+        velocity = distinct_usernames = np.ones(len(df))
+
+    return np.column_stack([
+        usernames.str.len().to_numpy()[username_codes],
+        passwords.str.len().to_numpy()[password_codes],
+        ip_score[ip_codes],
+        usernames.str.lower().isin(COMMON_USERNAMES).to_numpy(dtype=int)[username_codes],
+        passwords.str.lower().isin(WEAK_PASSWORDS).to_numpy(dtype=int)[password_codes],
+        distinct_parts[ip_codes] / 4.0,
+        velocity,
+        np.minimum(distinct_usernames, MAX_TRACKED_USERNAMES)
+    ]).astype(float)
+
+
+def extract_features_chunks(chunks, window=VELOCITY_WINDOW_SECONDS):
+    """
+    Yield the features of each DataFrame in ``chunks``, for logs too large to
+    load at once. Chunks must be in time order, as the log is written: the
+    attempts from the last ``window`` seconds of each chunk (at most one
+    chunk's worth) are carried into the next, so per-IP activity carries
+    across chunk boundaries.
+    """
+    import pandas as pd
+
+    carry = None
+    for chunk in chunks:
+        frame = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+        yield extract_features_frame(frame)[len(frame) - len(chunk):]
+
+        if 'timestamp' not in frame.columns or not len(frame):
+            continue
+        times = pd.to_datetime(frame['timestamp'], format='ISO8601', errors='coerce')
+        recent = frame[times > times.max() - pd.Timedelta(seconds=window)]
+        carry = recent.iloc[-len(chunk):] if len(chunk) else recent
@@ -0,0 +1,280 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Geolocation Cache Module
+
+Bounded cache for IP geolocation results. Entries are evicted in LRU order
+once the cache is full and expire after a TTL, with a shorter TTL for failed
+lookups. Changes are persisted write-behind to an append-only journal that
+is periodically compacted, instead of rewriting the whole cache per miss.
+The journal is only read on the first lookup, so startup does not wait on it.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from storage import connect_sqlite
+
+
+class GeoCache:
+    """
+    LRU/TTL mapping of IP to location (``None`` for failed lookups).
+
+    Supports the ``in``, ``get`` and item assignment operations that
+    GeoResolver uses, so it can replace the plain dict cache.
+    """
+
+    def __init__(self, journal_path, max_entries=100000, positive_ttl=30 * 24 * 3600,
+                 negative_ttl=3600, flush_interval=5.0, legacy_path=None, logger=None):
+        self.journal_path = journal_path
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.flush_interval = flush_interval
+        self.legacy_path = legacy_path
+        self.logger = logger
+        self._entries = OrderedDict()  # ip -> (location, expires_at)
+        self._pending = []
+        self._journal_lines = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._flusher = None
+
+    def _ensure_loaded(self):
+        """Read the journal (or the legacy snapshot) the first time the cache is used."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            if os.path.exists(self.journal_path):
+                self._replay()
+            elif self.legacy_path and os.path.exists(self.legacy_path):
+                self._import_legacy(self.legacy_path)
+            self._loaded = True
+
+    def _replay(self):
+        """
+        Rebuild the cache from the journal, skipping expired entries. Reads
+        are not journaled, so LRU order after a restart follows write order.
+        """
+        now = time.time()
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._journal_lines += 1
+                try:
+                    ip, location, expires_at = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from an interrupted write
+                if expires_at > now:
+                    self._entries[ip] = (location, expires_at)
+                    self._entries.move_to_end(ip)
+                else:
+                    self._entries.pop(ip, None)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _import_legacy(self, legacy_path):
+        """Seed the cache from an old ip_cache.json snapshot."""
+        try:
+            with open(legacy_path, "r") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            if self.logger is not None:
+                self.logger.error(f"Error loading IP cache {legacy_path}: {e}")
+            return
+        self._store(legacy)
+
+    def _expiry(self, location):
+        ttl = self.positive_ttl if location is not None else self.negative_ttl
+        return time.time() + ttl
+
+    def _live(self, ip):
+        """Return the entry for ``ip`` if present and unexpired; caller holds the lock."""
+        entry = self._entries.get(ip)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self._entries[ip]
+            return None
+        self._entries.move_to_end(ip)
+        return entry
+
+    def __contains__(self, ip):
+        self._ensure_loaded()
+        with self._lock:
+            return self._live(ip) is not None
+
+    def get(self, ip, default=None):
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._live(ip)
+        return entry[0] if entry is not None else default
+
+    def __setitem__(self, ip, location):
+        self.update({ip: location})
+
+    def update(self, locations):
+        """Store several lookups at once."""
+        self._ensure_loaded()
+        self._store(locations)
+
+    def _store(self, locations):
+        with self._lock:
+            for ip, location in locations.items():
+                expires_at = self._expiry(location)
+                self._entries[ip] = (location, expires_at)
+                self._entries.move_to_end(ip)
+                self._pending.append((ip, location, expires_at))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.flush_interval:
+            self._start_flusher()
+        else:
+            self.flush()
+
+    def __len__(self):
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._entries)
+
+    def _start_flusher(self):
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="geo-cache-flusher",
+                                                     daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Error persisting IP cache: {e}")
+
+    def flush(self):
+        """Append pending changes to the journal, compacting it when it gets long."""
+        if not self._loaded:
+            return  # Nothing has changed since startup
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                compact = self._journal_lines + len(pending) > 2 * max(len(self._entries), 1000)
+                snapshot = list(self._entries.items()) if compact else None
+
+            if compact:
+                self._compact(snapshot)
+            elif pending:
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(entry) + "\n" for entry in pending)
+                self._journal_lines += len(pending)
+
+    def _compact(self, snapshot):
+        """Replace the journal with one line per live entry."""
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps([ip, location, expires_at]) + "\n"
+                         for ip, (location, expires_at) in snapshot)
+        os.replace(tmp_path, self.journal_path)
+        self._journal_lines = len(snapshot)
+
+
+class SQLiteGeoCache:
+    """
+    Geolocation cache shared by several worker processes through SQLite.
+
+    Same interface and TTL rules as GeoCache. Reads do not write, so once
+    the cache is full the oldest written entries are evicted first rather
+    than the least recently read.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS geo_cache (
+            ip TEXT PRIMARY KEY,
+            location TEXT,
+            expires_at REAL NOT NULL,
+            written INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_geo_cache_written ON geo_cache(written);
+    """
+
+    def __init__(self, path, max_entries=100000, positive_ttl=30 * 24 * 3600, negative_ttl=3600,
+                 legacy_path=None, logger=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.logger = logger
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+        if legacy_path and os.path.exists(legacy_path) and not len(self):
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path):
+        """Seed the cache from an old ip_cache.json snapshot in one transaction."""
+        try:
+            with open(legacy_path, "r") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            if self.logger is not None:
+                self.logger.error(f"Error loading IP cache {legacy_path}: {e}")
+            return
+        self.update(legacy)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def _live(self, ip):
+        return self._connection().execute(
+            "SELECT location FROM geo_cache WHERE ip = ? AND expires_at > ?", (ip, time.time())
+        ).fetchone()
+
+    def __contains__(self, ip):
+        return self._live(ip) is not None
+
+    def get(self, ip, default=None):
+        row = self._live(ip)
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def __setitem__(self, ip, location):
+        self.update({ip: location})
+
+    def update(self, locations):
+        """Store several lookups in one transaction."""
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO geo_cache (ip, location, expires_at, written) "
+                "VALUES (?, ?, ?, (SELECT COALESCE(MAX(written), 0) + 1 FROM geo_cache))",
+                [
+                    (ip, json.dumps(location),
+                     now + (self.positive_ttl if location is not None else self.negative_ttl))
+                    for ip, location in locations.items()
+                ]
+            )
+            conn.execute("DELETE FROM geo_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM geo_cache WHERE written <= "
+                "(SELECT MAX(written) FROM geo_cache) - ?",
+                (self.max_entries,)
+            )
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM geo_cache").fetchone()[0]
+
+    def flush(self):
+        """Writes are committed immediately; kept for interface parity with GeoCache."""
@@ -0,0 +1,332 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Geolocation Module
+
+Resolves attacker IPs to locations. An optional offline IP-range database
+answers lookups without the network. Remaining cache misses are collected and
+resolved concurrently through a pooled HTTP session, using the provider's
+batch endpoint when it has one, and a token bucket keeps the request rate
+within the provider's limits.
+"""
+
+import csv
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` tokens are available, then take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeoProvider:
+    """
+    Interface for geolocation backends.
+
+    Locations are dicts with lat, lon and country keys; ``None`` means the
+    provider could not locate the IP. Providers with a batch endpoint set
+    ``batch_size`` to the largest number of IPs one request may carry.
+    """
+
+    batch_size = 0
+
+    def lookup(self, session, ip):
+        """Return the location of a single IP."""
+        raise NotImplementedError
+
+    def lookup_batch(self, session, ips):
+        """Return a mapping of IP to location for up to ``batch_size`` IPs."""
+        return {ip: self.lookup(session, ip) for ip in ips}
+
+
+class IPApiProvider(GeoProvider):
+    """Provider for the ip-api.com JSON API (or a compatible stub server)."""
+
+    FIELDS = "status,message,country,lat,lon,query"
+
+    def __init__(self, api_url="http://ip-api.com/json/", batch_url="http://ip-api.com/batch",
+                 timeout=5, batch_size=100):
+        self.api_url = api_url
+        self.batch_url = batch_url
+        self.timeout = timeout
+        self.batch_size = batch_size if batch_url else 0
+
+    @staticmethod
+    def _parse(data):
+        if data.get("status") == "success":
+            return {"lat": data["lat"], "lon": data["lon"], "country": data["country"]}
+        return None
+
+    def lookup(self, session, ip):
+        response = session.get(f"{self.api_url}{ip}", params={"fields": self.FIELDS}, timeout=self.timeout)
+        response.raise_for_status()
+        return self._parse(response.json())
+
+    def lookup_batch(self, session, ips):
+        response = session.post(self.batch_url, params={"fields": self.FIELDS}, json=list(ips),
+                                timeout=self.timeout)
+        response.raise_for_status()
+        results = {ip: None for ip in ips}
+        for data in response.json():
+            if data.get("query") in results:
+                results[data["query"]] = self._parse(data)
+        return results
+
+
+IPV4 = struct.Struct("!I")
+
+
+def _ipv4_to_int(ip):
+    """Return the integer form of an IPv4 address, or None for anything else."""
+    try:
+        return IPV4.unpack(socket.inet_pton(socket.AF_INET, ip.strip()))[0]
+    except OSError:
+        # Range files may also give addresses in integer form
+        if ip.strip().isdigit() and int(ip) <= 0xFFFFFFFF:
+            return int(ip)
+        return None
+
+
+class IPRangeDatabase:
+    """
+    Offline IPv4 range database backed by a memory-mapped binary file.
+
+    The source CSV (start_ip, end_ip, country, lat, lon) is compiled once into
+    a sorted, fixed-width, column-oriented file. Lookups binary-search the
+    memory-mapped start column, so opening the database is cheap and no
+    lookup touches the network.
+    """
+
+    MAGIC = b"ALPHAGEO"
+    VERSION = 1
+    HEADER = struct.Struct("<8sIII")  # magic, version, record count, country table size
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, countries_size = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{path} is not a compiled IP range database")
+
+        offset = self.HEADER.size
+        self.starts = np.frombuffer(self._mmap, dtype="<u4", count=count, offset=offset)
+        offset += 4 * count
+        self.ends = np.frombuffer(self._mmap, dtype="<u4", count=count, offset=offset)
+        offset += 4 * count
+        self.lats = np.frombuffer(self._mmap, dtype="<f4", count=count, offset=offset)
+        offset += 4 * count
+        self.lons = np.frombuffer(self._mmap, dtype="<f4", count=count, offset=offset)
+        offset += 4 * count
+        self.country_ids = np.frombuffer(self._mmap, dtype="<u2", count=count, offset=offset)
+        offset += 2 * count
+        self.countries = self._mmap[offset:offset + countries_size].decode("utf-8").split("\n")
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def compile(cls, csv_path, db_path):
+        """Compile the range CSV at ``csv_path`` into a binary file at ``db_path``."""
+        starts, ends, lats, lons, country_ids = [], [], [], [], []
+        countries = {}
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) < 5:
+                    continue
+                start, end = _ipv4_to_int(row[0]), _ipv4_to_int(row[1])
+                if start is None or end is None:
+                    continue  # Header row or IPv6 range
+                try:
+                    lat, lon = float(row[3]), float(row[4])
+                except ValueError:
+                    continue
+                starts.append(start)
+                ends.append(end)
+                lats.append(lat)
+                lons.append(lon)
+                country_ids.append(countries.setdefault(row[2], len(countries)))
+
+        if len(countries) > 0xFFFF:
+            raise ValueError("Too many distinct countries for the range database format")
+
+        order = np.argsort(np.array(starts, dtype="<u4"), kind="stable")
+        country_table = "\n".join(countries).encode("utf-8")
+
+        tmp_path = f"{db_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(starts), len(country_table)))
+            f.write(np.array(starts, dtype="<u4")[order].tobytes())
+            f.write(np.array(ends, dtype="<u4")[order].tobytes())
+            f.write(np.array(lats, dtype="<f4")[order].tobytes())
+            f.write(np.array(lons, dtype="<f4")[order].tobytes())
+            f.write(np.array(country_ids, dtype="<u2")[order].tobytes())
+            f.write(country_table)
+        os.replace(tmp_path, db_path)
+
+    @classmethod
+    def open(cls, csv_path, db_path):
+        """Open ``db_path``, compiling it first if ``csv_path`` is newer or it is missing."""
+        if csv_path and os.path.exists(csv_path):
+            if not os.path.exists(db_path) or os.path.getmtime(db_path) < os.path.getmtime(csv_path):
+                cls.compile(csv_path, db_path)
+        return cls(db_path)
+
+    def _location(self, index):
+        return {
+            "lat": round(float(self.lats[index]), 4),
+            "lon": round(float(self.lons[index]), 4),
+            "country": self.countries[self.country_ids[index]]
+        }
+
+    def lookup(self, ip):
+        """Return the location of ``ip``, or None if no range contains it."""
+        value = _ipv4_to_int(ip)
+        if value is None or not len(self.starts):
+            return None
+        # Search with the column's own dtype; a mismatched key would copy the column
+        index = int(np.searchsorted(self.starts, np.uint32(value), side="right")) - 1
+        if index >= 0 and value <= self.ends[index]:
+            return self._location(index)
+        return None
+
+    def lookup_many(self, ips):
+        """Return a mapping of IP to location for the IPs found in the database."""
+        values = {ip: _ipv4_to_int(ip) for ip in ips}
+        values = {ip: value for ip, value in values.items() if value is not None}
+        if not values or not len(self.starts):
+            return {}
+
+        keys = np.fromiter(values.values(), dtype="<u4", count=len(values))
+        indexes = np.searchsorted(self.starts, keys, side="right") - 1
+        hits = (indexes >= 0) & (keys <= self.ends[np.maximum(indexes, 0)])
+        return {
+            ip: self._location(index)
+            for ip, index, hit in zip(values, indexes, hits)
+            if hit
+        }
+
+
+class GeoResolver:
+    """
+    Resolves IPs through ``provider``, caching the results in ``cache``.
+
+    ``cache`` is any mapping of IP to location that supports ``in``, ``get``
+    and ``update`` (a dict, GeoCache or SQLiteGeoCache). ``on_update`` is called once
+    after each call that added entries to it, so persistence happens per
+    batch of lookups rather than per IP. When an ``offline`` IPRangeDatabase
+    is given it is consulted first and the HTTP provider only sees its misses.
+    ``on_resolve(seconds, hits, misses)`` is called after every resolve call,
+    counting offline database hits as cache hits, and ``errors`` counts
+    provider requests that failed.
+    """
+
+    def __init__(self, provider, cache, requests_per_minute=45, max_workers=4,
+                 on_update=None, logger=None, offline=None, on_resolve=None):
+        self.provider = provider
+        self.cache = cache
+        self.offline = offline
+        self.on_update = on_update
+        self.on_resolve = on_resolve
+        self.logger = logger
+        self.errors = 0
+        self.rate_limiter = TokenBucket(requests_per_minute / 60.0, capacity=max_workers)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geo")
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The pooled HTTP session, created (and requests imported) on the first lookup."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _fetch(self, ips):
+        """Resolve one request's worth of IPs, mapping failures to ``None``."""
+        import requests
+
+        self.rate_limiter.acquire()
+        try:
+            if len(ips) > 1 and self.provider.batch_size:
+                return self.provider.lookup_batch(self.session, ips)
+            return {ip: self.provider.lookup(self.session, ip) for ip in ips}
+        except requests.RequestException as e:
+            if self.logger is not None:
+                self.logger.error(f"Network error getting location for {len(ips)} IP(s): {e}")
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.error(f"Unexpected error getting location for {len(ips)} IP(s): {e}")
+        with self._session_lock:
+            self.errors += 1
+        return {ip: None for ip in ips}
+
+    def resolve(self, ip):
+        """Return the location of a single IP."""
+        return self.resolve_many([ip]).get(ip)
+
+    def resolve_many(self, ips):
+        """Return a mapping of IP to location, resolving cache misses concurrently."""
+        started = time.perf_counter()
+        ips = list(dict.fromkeys(ips))
+        found = self.offline.lookup_many(ips) if self.offline is not None else {}
+        missing = [ip for ip in ips if ip not in found and ip not in self.cache]
+
+        if missing:
+            step = self.provider.batch_size or 1
+            chunks = [missing[i:i + step] for i in range(0, len(missing), step)]
+            if len(chunks) == 1:
+                resolved = [self._fetch(chunks[0])]
+            else:
+                resolved = list(self._executor.map(self._fetch, chunks))
+            updates = {}
+            for results in resolved:
+                updates.update(results)
+            self.cache.update(updates)
+            found.update(updates)
+            failed = [ip for ip, location in updates.items() if location is None]
+            if failed and self.logger is not None:
+                self.logger.warning(f"Failed to get location for {len(failed)} IP(s), e.g. {failed[0]}")
+            if self.on_update is not None:
+                self.on_update()
+
+        locations = {ip: found[ip] if ip in found else self.cache.get(ip) for ip in ips}
+        if self.on_resolve is not None:
+            self.on_resolve(time.perf_counter() - started, len(ips) - len(missing), len(missing))
+        return locations
@@ -0,0 +1,116 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Live Feed Module
+
+Pushes newly logged attempts to connected dashboards. Written batches are
+enriched with their locations on a background thread and appended to an
+in-memory ring of recent events, which Server-Sent Events clients wait on and
+which also answers "last N attempts" requests without reading the log.
+"""
+
+import json
+import queue
+import threading
+from collections import deque
+
+
+class AttemptFeed:
+    """
+    Bounded ring of (sequence, event) pairs with blocking waits.
+
+    Sequence numbers increase by one per event, so an SSE client can resume
+    from the last id it saw. Clients that fall further behind than the ring
+    holds skip the events that were dropped.
+    """
+
+    def __init__(self, maxlen=500):
+        self.maxlen = maxlen
+        self._events = deque(maxlen=maxlen)
+        self._last_seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self):
+        return self._last_seq
+
+    def publish(self, events):
+        """Append events, numbering them after the last one."""
+        with self._cond:
+            for event in events:
+                self._last_seq += 1
+                self._events.append((self._last_seq, event))
+            self._cond.notify_all()
+
+    def publish_numbered(self, items):
+        """Append (sequence, event) pairs numbered elsewhere, e.g. by another worker."""
+        with self._cond:
+            for seq, event in items:
+                if seq > self._last_seq:
+                    self._last_seq = seq
+                    self._events.append((seq, event))
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._events)
+
+    def recent(self, limit):
+        """Return up to ``limit`` newest events, oldest first."""
+        with self._cond:
+            items = list(self._events)[-limit:] if limit > 0 else []
+        return [event for _, event in items]
+
+    def snapshot(self, limit):
+        """Return (last sequence, up to ``limit`` newest events), taken together so no event falls between them."""
+        with self._cond:
+            items = list(self._events)[-limit:] if limit > 0 else []
+            return self._last_seq, [event for _, event in items]
+
+    def wait(self, after, timeout=None):
+        """Block until there are events after sequence ``after`` (or ``timeout``) and return them."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_seq > after, timeout)
+            return [(seq, event) for seq, event in self._events if seq > after]
+
+
+class FeedPublisher:
+    """
+    Turns written attempt batches into feed events on a background thread.
+
+    ``enrich(batch)`` returns the events for a batch (looking up locations,
+    which may hit the network), and ``sink(events)`` publishes them, so the
+    attempt writer never waits on geolocation.
+    """
+
+    def __init__(self, enrich, sink, max_queue=1000, logger=None):
+        self.enrich = enrich
+        self.sink = sink
+        self.logger = logger
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, batch):
+        """Queue a written batch; batches are dropped rather than blocking when the queue is full."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="feed-publisher", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            if self.logger is not None:
+                self.logger.warning(f"Live feed is behind; dropped {len(batch)} attempt(s).")
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                self.sink(self.enrich(batch))
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Error publishing live feed events: {e}")
+
+
+def format_sse(seq, event):
+    """Encode one feed event as a Server-Sent Events message."""
+    return f"id: {seq}\nevent: attempt\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,274 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Metrics Module
+
+In-process counters, latency histograms and scrape-time gauges, rendered in
+the Prometheus text exposition format for the /metrics endpoint. Recording
+a value is a dictionary lookup, a bisect and a short locked update, so it
+can sit on the login path. Each worker process keeps its own metrics.
+"""
+
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds, from cached classifications (~10µs) up to slow API calls
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RETRAIN_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """A named metric with optional labels; each label combination is a child."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Unlabelled metrics are reported (as zero) before their first update
+            self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Return the child for these label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+                self._children[values] = child
+        return child
+
+    def _samples(self):
+        with self._lock:
+            children = {tuple(str(v) for v in values): child for values, child in self._children.items()}
+        for values, child in sorted(children.items()):
+            yield values, child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._samples():
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self._value)}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, e.g. verdicts or retrain runs."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _Timer:
+    """Times a block (``with``) or every call of a function (as a decorator)."""
+
+    __slots__ = ("_observe", "_started")
+
+    def __init__(self, observe):
+        self._observe = observe
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._observe(time.perf_counter() - self._started)
+
+    def __call__(self, func):
+        observe = self._observe
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(perf_counter() - started)
+        return timed
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # One slot per bucket plus +Inf; cumulated only when rendered
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self):
+        return _Timer(self.observe)
+
+    def snapshot(self):
+        """(count, sum, per-bucket counts) as of now."""
+        with self._lock:
+            counts = list(self._counts)
+            return sum(counts), self._sum, counts
+
+    def render(self, name, labelnames, values):
+        count, total, counts = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, bucket in zip(self._bounds + (math.inf,), counts):
+            cumulative += bucket
+            labels = _format_labels(labelnames, values, ("le", _format_value(float(bound))))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Latency distribution in seconds, bucketed by ``buckets`` upper bounds."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+class CallbackMetric:
+    """
+    A gauge or counter whose value is read from ``function`` at scrape time,
+    for numbers the app already keeps (sizes, versions, error counts).
+    ``function`` returns a number, or with ``labelnames`` a mapping of label
+    value tuples to numbers.
+    """
+
+    def __init__(self, name, documentation, kind, function, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.function = function
+        self.labelnames = tuple(labelnames)
+
+    def render(self, logger=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.function()
+        except Exception as e:
+            if logger is not None:
+                logger.error(f"Error collecting metric {self.name}: {e}")
+            return lines
+        samples = value.items() if self.labelnames else [((), value)]
+        for values, sample in samples:
+            if sample is None:
+                continue
+            values = values if isinstance(values, tuple) else (values,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of one process, rendered together by ``render()``."""
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self._metrics = []
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._names:
+                raise ValueError(f"Duplicate metric name: {metric.name}")
+            self._names.add(metric.name)
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, kind, function, labelnames=()):
+        if kind not in ("counter", "gauge"):
+            raise ValueError(f"Unknown callback metric type: {kind}")
+        return self._register(CallbackMetric(name, documentation, kind, function, labelnames))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            if isinstance(metric, CallbackMetric):
+                lines.extend(metric.render(self.logger))
+            else:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,75 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Response Cache Module
+
+Versioned cache for the dashboard API responses. Entries are keyed by the
+request together with the data version they were computed from (the attempt
+high-water mark and model version), so they never need explicit
+invalidation: new attempts change the key and old entries age out of the LRU.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses with single-flight computation.
+
+    When several requests miss on the same key at once, only the first one
+    computes the response and the others wait for its result.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag(key):
+        """Return the ETag for ``key``; it depends only on the key, not the body."""
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def get_or_compute(self, key, compute):
+        """Return the cached body for ``key``, calling ``compute`` at most once per key."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                waiter = self._inflight[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            waiter.wait()
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key]
+            # The owner failed; compute our own result without caching it
+            return compute()
+
+        try:
+            body = compute()
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = body
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return body
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            waiter.set()
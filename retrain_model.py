@@ -1,105 +1,216 @@
 """
 Retrain the honeypot ML model with realistic attack data
 This will create a much better classifier for detecting real attacks
+
+The log is streamed in chunks, so memory use stays flat however large it
+grows: a first pass fits the scalers and keeps a bounded random sample of
+feature rows, every (scaling, K) candidate is scored on that sample in a
+process pool, and a second pass refines the winner as a MiniBatchKMeans
+model over every row. Workers read the scaled samples from memory-mapped
+.npy files instead of receiving copies.
+
+Usage: python retrain_model.py [--k-min 2] [--k-max 8] [--scalings standard,robust,minmax]
+                               [--jobs N] [--report report.json]
 """
 
-import csv
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+from sklearn import config_context
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
 from sklearn.metrics import silhouette_score
-import joblib
-import matplotlib.pyplot as plt
+from config import Config
+from features import FEATURE_NAMES, extract_features_chunks, extract_features_row
+from segments import segment_paths
+from classifier import ModelBundle, save_model_bundle, saved_model_version, select_attacker_cluster
+
+LOG_COLUMNS = ["timestamp", "ip", "username", "password"]
+# Scalers that fold into the centroid artifact; robust scaling has no partial_fit, so it is fit on the sample
+SCALERS = {"standard": StandardScaler, "robust": RobustScaler, "minmax": MinMaxScaler}
+# Rows per MiniBatchKMeans update in the streaming pass
+MINI_BATCH_SIZE = 4096
+SILHOUETTE_WORKING_MEMORY_MB = 64
+
+
+class FeatureSample:
+    """A uniform random sample of at most ``size`` feature rows from a stream of chunks"""
+    
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.rows = None
+        self.keys = np.empty(0)
+    
+    def add(self, X):
+        # Give every row a random key and keep the rows with the smallest keys
+        rows = X if self.rows is None else np.vstack([self.rows, X])
+        keys = np.concatenate([self.keys, self.rng.random(len(X))])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            rows, keys = rows[keep], keys[keep]
+        self.rows, self.keys = rows, keys
+
+
+def read_log_chunks(path, chunk_size, segment_dir=None):
+    """
+    Yield the attempt log as DataFrames of at most ``chunk_size`` rows: its
+    rotated segments in ``segment_dir`` first, oldest first, then the active log
+    """
+    paths = segment_paths(segment_dir) if segment_dir else []
+    if os.path.exists(path) or not paths:
+        paths.append(path)
+    for source in paths:
+        # pandas decompresses the .csv.gz segments and skips their summary footers
+        for chunk in pd.read_csv(source, header=None, names=LOG_COLUMNS, usecols=range(len(LOG_COLUMNS)),
+                                 dtype=str, keep_default_na=False, chunksize=chunk_size):
+            # Skip the header row written by setup.py
+            yield chunk[chunk["timestamp"] != "timestamp"]
+
+
+def log_features(path, chunk_size, segment_dir=None):
+    """Feature arrays for the whole log, one chunk at a time"""
+    return extract_features_chunks(read_log_chunks(path, chunk_size, segment_dir))
+
+
+_shared_matrices = {}
+
+
+def _limit_worker_threads():
+    """Pool initializer: one BLAS/OpenMP thread per worker, as the pool already uses every core"""
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+
+def evaluate_candidate(path, scaling, k):
+    """Fit KMeans with ``k`` clusters on the memory-mapped matrix at ``path`` and score it"""
+    started = time.perf_counter()
+    X = _shared_matrices.get(path)
+    if X is None:
+        X = _shared_matrices[path] = np.load(path, mmap_mode="r")
+    
+    model = KMeans(n_clusters=k, random_state=42, n_init=10).fit(X)
+    if len(np.unique(model.labels_)) < 2:
+        silhouette_avg = -1.0
+    else:
+        # Compute pairwise distances in small blocks rather than sklearn's default 1GB
+        with config_context(working_memory=SILHOUETTE_WORKING_MEMORY_MB):
+            silhouette_avg = float(silhouette_score(X, model.labels_))
+    return {
+        "scaling": scaling,
+        "k": k,
+        "silhouette": silhouette_avg,
+        "inertia": float(model.inertia_),
+        "seconds": time.perf_counter() - started,
+        "centers": model.cluster_centers_
+    }
+
+
+def search_candidates(X_sample, scalers, k_range, jobs):
+    """Score every (scaling, K) pair on the sample, in parallel; return them best first"""
+    with tempfile.TemporaryDirectory(prefix="honeypot-search-") as workdir:
+        paths = {}
+        for scaling, scaler in scalers.items():
+            paths[scaling] = os.path.join(workdir, f"{scaling}.npy")
+            np.save(paths[scaling], np.ascontiguousarray(scaler.transform(X_sample)))
+        
+        tasks = [(paths[scaling], scaling, k) for scaling in scalers for k in k_range]
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_limit_worker_threads) as pool:
+                results = list(pool.map(evaluate_candidate, *zip(*tasks)))
+        else:
+            results = [evaluate_candidate(*task) for task in tasks]
+    
+    # Inertia only compares models with the same scaling and K, so it just breaks ties
+    return sorted(results, key=lambda r: (-r["silhouette"], r["inertia"]))
+
 
-def analyze_and_retrain():
+def analyze_and_retrain(log_file=Config.LOG_FILE, model_file=Config.MODEL_FILE,
+                        chunk_size=Config.TRAINING_CHUNK_SIZE, sample_size=Config.SILHOUETTE_SAMPLE_SIZE,
+                        k_range=range(2, 9), scalings=tuple(SCALERS), jobs=None, report_file=None,
+                        segment_dir=Config.LOG_SEGMENT_DIR):
     """Analyze the log data and retrain the model with better features"""
     
     print("🧠 Advanced ML Model Training for Honeypot")
     print("=" * 50)
-      # Load the logs
+    
+    # First pass: fit the streaming scalers and sample rows for the search
+    print(f"🔍 Extracting advanced features from {log_file} in chunks of {chunk_size}...")
+    scalers = {scaling: SCALERS[scaling]() for scaling in scalings}
+    sample = FeatureSample(sample_size)
+    total = 0
     try:
-        df = pd.read_csv("logs.csv", names=["timestamp", "ip", "username", "password"])
-        print(f"📊 Loaded {len(df)} log entries for training")
+        for X in log_features(log_file, chunk_size, segment_dir):
+            if len(X):
+                for scaler in scalers.values():
+                    if hasattr(scaler, "partial_fit"):
+                        scaler.partial_fit(X)
+                sample.add(X)
+                total += len(X)
     except FileNotFoundError:
-        print("❌ No logs.csv found. Run the setup script first!")
+        print(f"❌ No {log_file} found. Run the setup script first!")
         return
     
-    # Extract enhanced features
-    features = []
-    feature_names = [
-        "username_length", "password_length", "ip_score", 
-        "username_is_common", "password_is_weak", "ip_entropy"
-    ]
+    print(f"📊 Loaded {total} log entries for training")
+    if total < 10:
+        print("❌ Need at least 10 log entries to train.")
+        return
     
-    # Common attacker indicators
-    common_usernames = {"admin", "administrator", "root", "sa", "oracle", "test", "guest", "user"}
-    weak_passwords = {"password", "123456", "admin", "password123", "12345", "qwerty", "abc123"}
+    X_sample = sample.rows
+    for scaler in scalers.values():
+        if not hasattr(scaler, "partial_fit"):
+            scaler.fit(X_sample)
     
-    print("🔍 Extracting advanced features...")
+    # Score every candidate on the sample; silhouette scoring is quadratic in rows
+    k_range = [k for k in k_range if k < len(X_sample)]
+    jobs = min(jobs or os.cpu_count() or 1, len(k_range) * len(scalers))
+    print(f"🎯 Searching K={k_range[0]}..{k_range[-1]} with {', '.join(scalers)} scaling "
+          f"on {len(X_sample)} sampled entries ({jobs} processes)...")
+    ranked = search_candidates(X_sample, scalers, k_range, jobs)
     
-    for _, row in df.iterrows():
-        ip, username, password = row["ip"], row["username"], row["password"]
-        
-        # Basic features
-        username_len = len(username)
-        password_len = len(password)
-        ip_parts = ip.split('.')
-        ip_score = sum(int(part) for part in ip_parts if part.isdigit())
-        
-        # Advanced features
-        username_is_common = 1 if username.lower() in common_usernames else 0
-        password_is_weak = 1 if password.lower() in weak_passwords else 0
-        
-        # IP entropy (randomness indicator)
-        ip_entropy = len(set(ip_parts)) / 4.0  # Diversity of IP octets
-        
-        features.append([
-            username_len, password_len, ip_score,
-            username_is_common, password_is_weak, ip_entropy
-        ])
-    
-    # Convert to numpy array and scale features
-    X = np.array(features)
-    
-    # Standardize features for better clustering
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    
-    # Find optimal number of clusters
-    print("🎯 Finding optimal clustering parameters...")
-    silhouette_scores = []
-    K_range = range(2, 6)
-    
-    for k in K_range:
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        cluster_labels = kmeans.fit_predict(X_scaled)
-        silhouette_avg = silhouette_score(X_scaled, cluster_labels)
-        silhouette_scores.append(silhouette_avg)
-        print(f"   K={k}: Silhouette Score = {silhouette_avg:.3f}")
-    
-    # Use the best K
-    best_k = K_range[np.argmax(silhouette_scores)]
-    print(f"✅ Best number of clusters: {best_k}")
-    
-    # Train final model
-    final_model = KMeans(n_clusters=best_k, random_state=42, n_init=10)
-    cluster_labels = final_model.fit_predict(X_scaled)
+    print("\n🏆 Ranked candidates:")
+    print(f"   {'#':>3}  {'scaling':<9} {'K':>3}  {'silhouette':>10}  {'inertia':>12}  {'seconds':>8}")
+    for rank, result in enumerate(ranked, 1):
+        print(f"   {rank:>3}  {result['scaling']:<9} {result['k']:>3}  {result['silhouette']:>10.3f}  "
+              f"{result['inertia']:>12.1f}  {result['seconds']:>8.2f}")
+    
+    winner = ranked[0]
+    best_k = winner["k"]
+    scaler = scalers[winner["scaling"]]
+    print(f"✅ Best model: K={best_k} with {winner['scaling']} scaling")
+    
+    # Second pass: start from the winner's clustering of the sample and refine it on every row
+    print("🔁 Training final model over the full log...")
+    final_model = MiniBatchKMeans(n_clusters=best_k, init=winner["centers"], n_init=1,
+                                  batch_size=MINI_BATCH_SIZE, random_state=42)
+    for X in log_features(log_file, chunk_size, segment_dir):
+        for start in range(0, len(X), MINI_BATCH_SIZE):
+            final_model.partial_fit(scaler.transform(X[start:start + MINI_BATCH_SIZE]))
+    cluster_labels = final_model.predict(scaler.transform(X_sample))
     
     # Analyze clusters to identify attacker vs normal patterns
-    print("\n📈 Cluster Analysis:")
+    print(f"\n📈 Cluster Analysis (from {len(X_sample)} sampled entries):")
     for i in range(best_k):
         cluster_mask = cluster_labels == i
-        cluster_data = X[cluster_mask]
+        cluster_data = X_sample[cluster_mask]
+        if len(cluster_data) == 0:
+            print(f"   Cluster {i}: no sampled entries\n")
+            continue
         
         avg_username_len = np.mean(cluster_data[:, 0])
         avg_password_len = np.mean(cluster_data[:, 1])
         common_username_rate = np.mean(cluster_data[:, 3])
         weak_password_rate = np.mean(cluster_data[:, 4])
         
-        cluster_size = np.sum(cluster_mask)
+        # Scale the sample's share up to the whole log
+        cluster_size = round(np.mean(cluster_mask) * total)
         
-        print(f"   Cluster {i} ({cluster_size} entries):")
+        print(f"   Cluster {i} (~{cluster_size} entries):")
         print(f"      Avg username length: {avg_username_len:.1f}")
         print(f"      Avg password length: {avg_password_len:.1f}")
         print(f"      Common username rate: {common_username_rate:.2%}")
@@ -112,37 +223,30 @@ def analyze_and_retrain():
             print(f"      👤 Likely normal users")
         print()
     
-    # Save the trained model and scaler
-    model_data = {
-        'model': final_model,
-        'scaler': scaler,
-        'feature_names': feature_names,
-        'n_clusters': best_k
-    }
-    
-    joblib.dump(model_data, "honeypot_model.pkl")
-    print("💾 Saved enhanced model to honeypot_model.pkl")
-    
-    # Create a simple classification function for the main app
-    print("🔧 Creating classification rules...")
-    
     # Analyze which cluster has more attacker characteristics
-    attacker_cluster = -1
-    max_attacker_score = 0
+    print("🔧 Creating classification rules...")
+    attacker_cluster = select_attacker_cluster(X_sample, cluster_labels, best_k)
+    print(f"🎯 Cluster {attacker_cluster} identified as primary attacker cluster")
     
-    for i in range(best_k):
-        cluster_mask = cluster_labels == i
-        cluster_data = X[cluster_mask]
-        
-        common_rate = np.mean(cluster_data[:, 3])
-        weak_rate = np.mean(cluster_data[:, 4])
-        attacker_score = common_rate + weak_rate
-        
-        if attacker_score > max_attacker_score:
-            max_attacker_score = attacker_score
-            attacker_cluster = i
+    if report_file:
+        with open(report_file, "w") as f:
+            json.dump({
+                "log_file": log_file,
+                "rows": total,
+                "sample_rows": len(X_sample),
+                "winner": {"scaling": winner["scaling"], "k": best_k, "attacker_cluster": attacker_cluster},
+                "candidates": [
+                    {key: value for key, value in result.items() if key != "centers"} for result in ranked
+                ]
+            }, f, indent=2)
+        print(f"📝 Wrote ranked search report to {report_file}")
     
-    print(f"🎯 Cluster {attacker_cluster} identified as primary attacker cluster")
+    # Save the trained model and scaler with the feature schema they expect
+    # A new version, so running workers reload it and drop verdicts cached for the old one
+    version = saved_model_version(model_file) + 1
+    bundle = ModelBundle(final_model, scaler, attacker_cluster, FEATURE_NAMES, version=version)
+    save_model_bundle(bundle, model_file)
+    print(f"💾 Saved enhanced model v{version} to {model_file} (and its .npz artifact for inference)")
     
     # Test the model
     print("\n🧪 Testing model on sample data:")
@@ -154,29 +258,39 @@ def analyze_and_retrain():
     ]
     
     for ip, username, password, expected in test_cases:
-        # Extract features
-        ip_parts = ip.split('.')
-        ip_score = sum(int(part) for part in ip_parts if part.isdigit())
-        username_is_common = 1 if username.lower() in common_usernames else 0
-        password_is_weak = 1 if password.lower() in weak_passwords else 0
-        ip_entropy = len(set(ip_parts)) / 4.0
+        # Classify the way the app does, from the centroid artifact
+        is_attacker = bundle.is_attacker(extract_features_row(ip, username, password))[0]
         
-        test_features = np.array([[
-            len(username), len(password), ip_score,
-            username_is_common, password_is_weak, ip_entropy
-        ]])
-        
-        test_scaled = scaler.transform(test_features)
-        prediction = final_model.predict(test_scaled)[0]
-        
-        result = "ATTACKER" if prediction == attacker_cluster else "NORMAL USER"
+        result = "ATTACKER" if is_attacker else "NORMAL USER"
         print(f"   {username}@{ip}: {result} ({expected})")
     
     print(f"\n🎉 Model training complete!")
-    print(f"   • Used {len(df)} training samples")
+    print(f"   • Used {total} training samples")
     print(f"   • {best_k} clusters identified")
     print(f"   • Enhanced features for better detection")
     print(f"   • Ready for real-time threat detection!")
 
 if __name__ == "__main__":
-    analyze_and_retrain()
+    parser = argparse.ArgumentParser(description="Retrain the honeypot model from the attempt log")
+    parser.add_argument("--log-file", default=Config.LOG_FILE)
+    parser.add_argument("--model-file", default=Config.MODEL_FILE)
+    parser.add_argument("--segment-dir", default=Config.LOG_SEGMENT_DIR,
+                        help="directory of rotated log segments read before the log")
+    parser.add_argument("--chunk-size", type=int, default=Config.TRAINING_CHUNK_SIZE,
+                        help="log rows read and featurized at a time")
+    parser.add_argument("--sample-size", type=int, default=Config.SILHOUETTE_SAMPLE_SIZE,
+                        help="rows sampled for choosing the number of clusters")
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=8)
+    parser.add_argument("--scalings", default=",".join(SCALERS),
+                        help=f"comma-separated feature scalings to try ({', '.join(SCALERS)})")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--report", help="write the ranked search results to this JSON file")
+    args = parser.parse_args()
+    
+    scalings = [name.strip() for name in args.scalings.split(",") if name.strip()]
+    unknown = [name for name in scalings if name not in SCALERS]
+    if unknown or not scalings or args.k_min < 2 or args.k_max < args.k_min:
+        parser.error(f"need 2 <= --k-min <= --k-max and scalings from {', '.join(SCALERS)}")
+    analyze_and_retrain(args.log_file, args.model_file, args.chunk_size, args.sample_size,
+                        range(args.k_min, args.k_max + 1), scalings, args.jobs, args.report, args.segment_dir)
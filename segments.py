@@ -0,0 +1,116 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Log Segment Module
+
+File format for rotated attempt log segments. A segment is an ordinary gzip
+file of CSV rows, so ``zcat`` and ``pandas.read_csv`` read it as usual, with
+a summary of its contents in a footer that can be read without
+decompressing the rows. The footer is two empty gzip members appended after
+the data: the first carries the summary (zlib-compressed JSON, base64
+encoded) in its comment field, and the second, of fixed size, records where
+the first one starts. Gzip readers skip both.
+"""
+
+import base64
+import gzip
+import json
+import os
+import re
+import struct
+import zlib
+
+SEGMENT_NAME = re.compile(r"^(\d{6})\.csv\.gz$")
+
+_GZIP_MAGIC = b"\x1f\x8b\x08"
+_FEXTRA = 0x04
+_FCOMMENT = 0x10
+# A final deflate block with no data
+_EMPTY_DEFLATE = b"\x03\x00"
+# Empty data: CRC32 and length are both zero
+_EMPTY_TRAILER = struct.pack("<II", 0, 0)
+_LOCATOR_ID = b"HS"
+_LOCATOR_FORMAT = "<QQ"  # summary member offset, length
+_LOCATOR_SIZE = 10 + 2 + 4 + struct.calcsize(_LOCATOR_FORMAT) + len(_EMPTY_DEFLATE) + len(_EMPTY_TRAILER)
+
+
+class SegmentError(ValueError):
+    """Raised for a file that is not a segment written by ``write_segment``."""
+
+
+def _header(flags):
+    # magic, deflate, flags, mtime 0, no extra flags, unknown OS
+    return _GZIP_MAGIC + bytes([flags]) + b"\x00\x00\x00\x00\x00\xff"
+
+
+def _summary_member(summary):
+    encoded = base64.b64encode(zlib.compress(json.dumps(summary, separators=(",", ":")).encode("utf-8")))
+    return _header(_FCOMMENT) + encoded + b"\x00" + _EMPTY_DEFLATE + _EMPTY_TRAILER
+
+
+def _locator_member(offset, length):
+    field = _LOCATOR_ID + struct.pack("<H", struct.calcsize(_LOCATOR_FORMAT)) + struct.pack(_LOCATOR_FORMAT, offset, length)
+    return _header(_FEXTRA) + struct.pack("<H", len(field)) + field + _EMPTY_DEFLATE + _EMPTY_TRAILER
+
+
+def segment_name(sequence):
+    return f"{sequence:06d}.csv.gz"
+
+
+def segment_paths(directory):
+    """Return the segment files in ``directory``, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in sorted(names) if SEGMENT_NAME.match(name)]
+
+
+def next_segment_path(directory):
+    """Return the path for the segment after the newest one in ``directory``."""
+    paths = segment_paths(directory)
+    sequence = int(SEGMENT_NAME.match(os.path.basename(paths[-1])).group(1)) + 1 if paths else 1
+    return os.path.join(directory, segment_name(sequence))
+
+
+def write_segment(path, data, summary, compresslevel=6):
+    """
+    Write CSV bytes ``data`` and its ``summary`` (a JSON-serializable dict) as
+    a segment at ``path``. The file is written under a temporary name, synced
+    and then renamed, so a segment is never seen half written.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(gzip.compress(data, compresslevel=compresslevel, mtime=0))
+        offset = f.tell()
+        member = _summary_member(summary)
+        f.write(member)
+        f.write(_locator_member(offset, len(member)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_segment_summary(path):
+    """Return the summary stored in the footer of the segment at ``path``."""
+    with open(path, "rb") as f:
+        try:
+            f.seek(-_LOCATOR_SIZE, os.SEEK_END)
+        except OSError:
+            raise SegmentError(f"{path} is too short to be a log segment")
+        locator = f.read(_LOCATOR_SIZE)
+        field = locator[12:16 + struct.calcsize(_LOCATOR_FORMAT)]
+        if locator[:3] != _GZIP_MAGIC or locator[3] != _FEXTRA or field[:2] != _LOCATOR_ID:
+            raise SegmentError(f"{path} has no segment summary footer")
+        offset, length = struct.unpack(_LOCATOR_FORMAT, field[4:])
+        f.seek(offset)
+        member = f.read(length)
+    if len(member) != length or member[:3] != _GZIP_MAGIC or member[3] != _FCOMMENT:
+        raise SegmentError(f"{path} has a damaged segment summary")
+    encoded = member[10:-(1 + len(_EMPTY_DEFLATE) + len(_EMPTY_TRAILER))]
+    return json.loads(zlib.decompress(base64.b64decode(encoded)).decode("utf-8"))
+
+
+def read_segment_data(path):
+    """Return the decompressed CSV bytes of the segment at ``path``."""
+    with gzip.open(path, "rb") as f:
+        return f.read()
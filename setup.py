@@ -8,11 +8,12 @@ import os
 import sys
 import csv
 import json
-import joblib
 import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
+from features import FEATURE_NAMES, extract_features_frame
+from classifier import ModelBundle, save_model_bundle, select_attacker_cluster
 
 def create_initial_logs():
     """Create initial logs.csv file with sample data if it doesn't exist."""
@@ -46,22 +47,8 @@ def create_initial_model():
         # Load the sample data
         df = pd.read_csv('logs.csv')
         
-        # Feature engineering
-        def ip_to_int(ip):
-            """Convert IP address to integer for ML processing."""
-            try:
-                parts = ip.split('.')
-                return sum(int(part) * (256 ** (3 - i)) for i, part in enumerate(parts))
-            except:
-                return 0
-        
-        df['username_length'] = df['username'].str.len()
-        df['password_length'] = df['password'].str.len()
-        df['ip_numeric'] = df['ip'].apply(ip_to_int)
-        
-        # Prepare features
-        features = ['username_length', 'password_length', 'ip_numeric']
-        X = df[features].values
+        # Same features the app classifies with
+        X = extract_features_frame(df)
         
         # Normalize features
         scaler = StandardScaler()
@@ -69,18 +56,11 @@ def create_initial_model():
         
         # Train K-means model
         model = KMeans(n_clusters=2, random_state=42, n_init=10)
-        model.fit(X_scaled)
-        
-        # Save model with metadata
-        model_data = {
-            'model': model,
-            'scaler': scaler,
-            'feature_names': features,
-            'n_clusters': 2,
-            'version': '1.0'
-        }
+        labels = model.fit_predict(X_scaled)
         
-        joblib.dump(model_data, 'honeypot_model.pkl')
+        # Save model with metadata, including the feature schema it was trained on
+        bundle = ModelBundle(model, scaler, select_attacker_cluster(X, labels, 2), FEATURE_NAMES, version=1)
+        save_model_bundle(bundle, 'honeypot_model.pkl')
         print("✅ Initial ML model created and saved")
 
 def create_ip_cache():
@@ -0,0 +1,269 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Shared State Module
+
+State shared by all worker processes when the app runs under a multi-process
+WSGI server such as gunicorn: the live dashboard counters, the retrain
+counter and the election of the single process that retrains the model.
+Counters live in a SQLite database in WAL mode; the trainer is whichever
+process holds an exclusive lock on the trainer lock file.
+"""
+
+import json
+import os
+import threading
+
+from aggregates import HEAVY_HITTERS, heavy_hitter_counts, heavy_hitter_seed
+from sketches import HyperLogLog
+from storage import connect_sqlite
+
+
+class SharedState:
+    """SQLite-backed counters shared between worker processes."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS seen_ips (
+            ip TEXT PRIMARY KEY
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS sketches (
+            name TEXT PRIMARY KEY,
+            registers BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS heavy_hitters (
+            sketch TEXT NOT NULL,
+            item TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            error INTEGER NOT NULL,
+            PRIMARY KEY (sketch, item)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_heavy_hitters_count ON heavy_hitters(sketch, count);
+        CREATE TABLE IF NOT EXISTS feed_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    @staticmethod
+    def _add(conn, name, amount):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    @staticmethod
+    def _get(conn, name):
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def add_new_logs(self, count, threshold):
+        """
+        Add ``count`` to the shared new-log counter. When it reaches
+        ``threshold`` the counter is reset and a retrain request is flagged
+        for the trainer; returns True in that case.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._add(conn, "new_logs", count)
+            if self._get(conn, "new_logs") < threshold:
+                return False
+            conn.execute("UPDATE counters SET value = 0 WHERE name = 'new_logs'")
+            conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('retrain_requested', 1)")
+            return True
+
+    def add_feed_events(self, events, keep):
+        """Append live feed events for every worker to relay, keeping the newest ``keep``."""
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT INTO feed_events (payload) VALUES (?)",
+                             ((json.dumps(event),) for event in events))
+            conn.execute("DELETE FROM feed_events WHERE seq <= (SELECT MAX(seq) FROM feed_events) - ?",
+                         (keep,))
+
+    def feed_events_since(self, seq):
+        """Return (sequence, event) pairs appended after ``seq``."""
+        rows = self._connection().execute(
+            "SELECT seq, payload FROM feed_events WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def take_retrain_request(self):
+        """Clear the retrain flag, returning whether it was set."""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE counters SET value = 0 WHERE name = 'retrain_requested' AND value = 1"
+            )
+            return cursor.rowcount == 1
+
+
+class SharedLiveStats:
+    """
+    LiveStats counterpart whose counters are shared by all worker processes.
+
+    The heavy-hitter sketches use the same Space-Saving update rule as
+    sketches.SpaceSaving, applied to rows of the heavy_hitters table.
+    Distinct IPs are kept in a shared HyperLogLog, or exactly in the
+    seen_ips table with ``exact_unique_ips``.
+    """
+
+    def __init__(self, state, top_k_capacity=1000, exact_unique_ips=False, sketch_precision=12):
+        self.state = state
+        self.top_k_capacity = top_k_capacity
+        self.exact_unique_ips = exact_unique_ips
+        self.sketch_precision = sketch_precision
+
+    def rebuild(self, store):
+        """Initialise the shared counters from ``store`` unless another worker already has."""
+        conn = self.state._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if self.state._get(conn, "initialized"):
+                return
+            conn.execute("DELETE FROM seen_ips")
+            if self.exact_unique_ips:
+                conn.executemany("INSERT OR IGNORE INTO seen_ips (ip) VALUES (?)",
+                                 ((ip,) for ip in store.distinct_ips()))
+            else:
+                conn.execute("INSERT OR REPLACE INTO sketches (name, registers) VALUES ('unique_ips', ?)",
+                             (store.ip_sketch().to_bytes(),))
+            conn.execute("DELETE FROM heavy_hitters")
+            for name in HEAVY_HITTERS:
+                conn.executemany(
+                    "INSERT INTO heavy_hitters (sketch, item, count, error) VALUES (?, ?, ?, 0)",
+                    ((name, value, count) for value, count in heavy_hitter_seed(store, name, self.top_k_capacity))
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)",
+                [
+                    ("total_attempts", store.count()),
+                    ("attacker_count", store.verdict_count("attacker")),
+                    ("initialized", 1),
+                ]
+            )
+
+    def _update_sketch(self, conn, name, counts):
+        """Apply one batch of counts to sketch ``name``; caller holds the write transaction."""
+        size = conn.execute("SELECT COUNT(*) FROM heavy_hitters WHERE sketch = ?", (name,)).fetchone()[0]
+        for value, count in counts.items():
+            updated = conn.execute(
+                "UPDATE heavy_hitters SET count = count + ? WHERE sketch = ? AND item = ?",
+                (count, name, value)
+            ).rowcount
+            if updated:
+                continue
+            floor = 0
+            if size >= self.top_k_capacity:
+                # Replace the smallest counter; its count bounds what we may have missed
+                item, floor = conn.execute(
+                    "SELECT item, count FROM heavy_hitters WHERE sketch = ? ORDER BY count LIMIT 1", (name,)
+                ).fetchone()
+                conn.execute("DELETE FROM heavy_hitters WHERE sketch = ? AND item = ?", (name, item))
+            else:
+                size += 1
+            conn.execute(
+                "INSERT INTO heavy_hitters (sketch, item, count, error) VALUES (?, ?, ?, ?)",
+                (name, value, floor + count, floor)
+            )
+
+    def record_many(self, rows):
+        """Account for a batch of (timestamp, ip, username, password, verdict) rows."""
+        counts = heavy_hitter_counts(rows)
+        conn = self.state._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self.state._add(conn, "total_attempts", len(rows))
+            self.state._add(conn, "attacker_count", sum(1 for row in rows if row[4] == "attacker"))
+            if self.exact_unique_ips:
+                conn.executemany("INSERT OR IGNORE INTO seen_ips (ip) VALUES (?)", ((row[1],) for row in rows))
+            else:
+                sketch = self._unique_ip_sketch(conn)
+                sketch.update(row[1] for row in rows)
+                conn.execute("INSERT OR REPLACE INTO sketches (name, registers) VALUES ('unique_ips', ?)",
+                             (sketch.to_bytes(),))
+            for name, batch_counts in counts.items():
+                self._update_sketch(conn, name, batch_counts)
+
+    def _unique_ip_sketch(self, conn):
+        row = conn.execute("SELECT registers FROM sketches WHERE name = 'unique_ips'").fetchone()
+        return HyperLogLog.from_bytes(row[0]) if row else HyperLogLog(self.sketch_precision)
+
+    def top_values(self, name, limit=None, min_count=1):
+        """Return (value, count) pairs from heavy-hitter sketch ``name``, most frequent first."""
+        sql = "SELECT item, count FROM heavy_hitters WHERE sketch = ? AND count >= ? ORDER BY count DESC"
+        params = [name, min_count]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [tuple(row) for row in self.state._connection().execute(sql, params).fetchall()]
+
+    def high_water_mark(self):
+        """Return the number of attempts written so far by all workers."""
+        return self.state._get(self.state._connection(), "total_attempts")
+
+    def snapshot(self):
+        """Return the current counters in the /api/stats response format."""
+        conn = self.state._connection()
+        counters = dict(conn.execute(
+            "SELECT name, value FROM counters WHERE name IN ('total_attempts', 'attacker_count')"
+        ).fetchall())
+        if self.exact_unique_ips:
+            unique_ips = conn.execute("SELECT COUNT(*) FROM seen_ips").fetchone()[0]
+        else:
+            unique_ips = self._unique_ip_sketch(conn).count()
+        return {
+            "total_attempts": counters.get("total_attempts", 0),
+            "unique_ips": unique_ips,
+            "attacker_count": counters.get("attacker_count", 0)
+        }
+
+
+class TrainerElection:
+    """
+    Elects one trainer among the worker processes with an exclusive,
+    non-blocking lock on ``lock_path``. The operating system releases the
+    lock when the holder exits, so another worker takes over on its next
+    ``try_acquire``.
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self._fd = None
+
+    @property
+    def is_leader(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """Return True if this process is (or has just become) the trainer."""
+        if self._fd is not None:
+            return True
+        import fcntl
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
@@ -0,0 +1,191 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Streaming Sketches Module
+
+Fixed-memory summaries of the attempt stream. SpaceSaving tracks the most
+frequent values (usernames, passwords, IPs) in at most ``capacity`` counters,
+however many distinct values an attacker sprays at the honeypot.
+HyperLogLog estimates how many distinct values were seen, and sketches for
+separate time buckets can be merged to count distinct values over a range.
+"""
+
+import hashlib
+import heapq
+import math
+
+import numpy as np
+
+
+def capacity_for_error(error):
+    """
+    Return the number of counters that keeps Space-Saving's overestimate
+    below ``error`` times the number of items seen.
+    """
+    if not 0 < error < 1:
+        raise ValueError("error must be between 0 and 1")
+    return math.ceil(1 / error)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter sketch (Metwally et al.).
+
+    Every value with a true frequency above N / capacity is guaranteed to be
+    tracked, and each reported count overestimates the true count by at most
+    its recorded error, which is itself at most N / capacity. Not
+    thread-safe; callers serialize updates.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}  # value -> [count, error]
+        self._heap = []  # (count, value), with stale entries skipped lazily
+
+    def __len__(self):
+        return len(self._counts)
+
+    def _push(self, value, count):
+        heapq.heappush(self._heap, (count, value))
+        if len(self._heap) > 4 * self.capacity:
+            # Drop the stale entries left behind by increments
+            self._heap = [(entry[0], item) for item, entry in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        """Remove and return (value, count) for the smallest tracked counter."""
+        while True:
+            count, value = heapq.heappop(self._heap)
+            entry = self._counts.get(value)
+            if entry is not None and entry[0] == count:
+                del self._counts[value]
+                return value, count
+
+    def add(self, value, count=1):
+        """Count ``count`` occurrences of ``value``."""
+        self.total += count
+        entry = self._counts.get(value)
+        if entry is not None:
+            entry[0] += count
+        elif len(self._counts) < self.capacity:
+            entry = self._counts[value] = [count, 0]
+        else:
+            # Replace the smallest counter; its count bounds what we may have missed
+            _, floor = self._pop_min()
+            entry = self._counts[value] = [floor + count, floor]
+        self._push(value, entry[0])
+
+    def update(self, counts):
+        """Count a mapping of value -> occurrences, e.g. a Counter for one batch."""
+        for value, count in counts.items():
+            self.add(value, count)
+
+    def seed(self, pairs, total=None):
+        """
+        Load exact (value, count) pairs, most frequent first, such as a
+        store's top values. Only the first ``capacity`` pairs are kept.
+        """
+        self._counts = {}
+        for value, count in pairs:
+            if len(self._counts) >= self.capacity:
+                break
+            self._counts[value] = [count, 0]
+        self._heap = [(entry[0], value) for value, entry in self._counts.items()]
+        heapq.heapify(self._heap)
+        self.total = total if total is not None else sum(entry[0] for entry in self._counts.values())
+
+    def top(self, limit=None, min_count=1):
+        """Return (value, count) pairs, most frequent first."""
+        items = [(value, entry[0]) for value, entry in self._counts.items() if entry[0] >= min_count]
+        if limit is not None:
+            return heapq.nlargest(limit, items, key=lambda item: item[1])
+        return sorted(items, key=lambda item: item[1], reverse=True)
+
+    def error(self, value):
+        """Return the maximum overestimate of ``value``'s count (0 if untracked)."""
+        entry = self._counts.get(value)
+        return entry[1] if entry is not None else 0
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-value estimator (Flajolet et al.) with 2**precision
+    one-byte registers.
+
+    The standard error is about 1.04 / sqrt(2**precision), e.g. 1.6% in 4 KB
+    at the default precision of 12. Sketches with the same precision merge
+    by taking the register-wise maximum, so per-bucket sketches can be
+    combined into one for any range of buckets. Not thread-safe.
+    """
+
+    def __init__(self, precision=12, registers=None):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            self.registers = np.zeros(self.size, dtype=np.uint8)
+        else:
+            self.registers = np.frombuffer(registers, dtype=np.uint8).copy()
+            if len(self.registers) != self.size:
+                raise ValueError("register data does not match the precision")
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild a sketch serialized with ``to_bytes``."""
+        return cls(int(len(data)).bit_length() - 1, data)
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    def add(self, value):
+        """Record one occurrence of the string ``value``."""
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        bits = 64 - self.precision
+        index = hashed >> bits
+        # Position of the leftmost 1 bit in the remaining bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch in place and return it."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precisions")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def reduced(self, precision):
+        """
+        Return this sketch folded down to a lower ``precision``, as if it had
+        been built at that precision, so sketches of different sizes merge.
+        """
+        if precision == self.precision:
+            return self
+        if precision > self.precision:
+            raise ValueError("cannot increase the precision of a sketch")
+        shift = self.precision - precision
+        registers = self.registers.reshape(1 << precision, 1 << shift).astype(np.int32)
+        # The dropped index bits become the leading bits of the rank
+        low = np.arange(1 << shift)
+        low_rank = shift - np.floor(np.log2(np.maximum(low, 1))).astype(np.int32)
+        ranks = np.where(low == 0, shift + registers, low_rank)
+        folded = HyperLogLog(precision)
+        folded.registers = np.where(registers == 0, 0, ranks).max(axis=1).astype(np.uint8)
+        return folded
+
+    def count(self):
+        """Return the estimated number of distinct values added."""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting over the empty registers
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,1150 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Attempt Storage Module
+
+Pluggable storage backends for recorded login attempts. The CSV backend keeps
+the original logs.csv format and is the default for small installs. The SQLite
+backend stores attempts in an indexed, WAL-mode database so that dashboard
+analytics run as indexed queries instead of rescanning the whole history.
+"""
+
+import base64
+import contextlib
+import csv
+import io
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+from segments import next_segment_path, read_segment_data, read_segment_summary, segment_paths, write_segment
+from sketches import HyperLogLog, capacity_for_error
+
+LOG_COLUMNS = ["timestamp", "ip", "username", "password"]
+SIMPLE_PASSWORDS = ['password', '123456', 'admin', 'qwerty']
+QUERYABLE_COLUMNS = {"ip", "username", "password"}
+
+# Rollup bucket formats; a bucket key is the matching prefix of the timestamp
+ROLLUP_FORMATS = {
+    "minute": "%Y-%m-%d %H:%M",
+    "hour": "%Y-%m-%d %H",
+    "day": "%Y-%m-%d",
+}
+ROLLUP_PREFIX_LENGTHS = {"minute": 16, "hour": 13, "day": 10}
+
+
+def rollup_counts(rows):
+    """Return {granularity: Counter(bucket -> attempts)} for a batch of attempt rows."""
+    counts = {granularity: Counter() for granularity in ROLLUP_PREFIX_LENGTHS}
+    for row in rows:
+        for granularity, length in ROLLUP_PREFIX_LENGTHS.items():
+            counts[granularity][row[0][:length]] += 1
+    return counts
+
+
+# Per-bucket HyperLogLog sketches of source IPs, for all attempts and for attackers
+IP_SKETCH_GRANULARITIES = ("hour", "day")
+IP_SKETCH_KINDS = ("ip", "attacker_ip")
+
+
+def ip_sketch_groups(rows):
+    """Return {(granularity, bucket, kind): [ip, ...]} for a batch of rows with verdicts."""
+    groups = {}
+    for row in rows:
+        kinds = IP_SKETCH_KINDS if row[4] == "attacker" else IP_SKETCH_KINDS[:1]
+        for granularity in IP_SKETCH_GRANULARITIES:
+            bucket = row[0][:ROLLUP_PREFIX_LENGTHS[granularity]]
+            for kind in kinds:
+                groups.setdefault((granularity, bucket, kind), []).append(row[1])
+    return groups
+
+
+def bucket_key(moment, granularity):
+    """Return the rollup bucket containing the datetime ``moment``."""
+    return moment.strftime(ROLLUP_FORMATS[granularity])
+
+
+def rows_frame(rows, verdicts=False):
+    """
+    Return (timestamp, ip, username, password) rows as a DataFrame, or with
+    ``verdicts`` rows that also carry a verdict. pandas is imported here
+    rather than at module load, so serving logins never needs it.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(rows, columns=LOG_COLUMNS + ["verdict"] if verdicts else LOG_COLUMNS)
+
+
+def connect_sqlite(path):
+    """Open a SQLite connection in WAL mode, as used by every SQLite-backed component."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class AttemptStore:
+    """
+    Interface shared by all attempt storage backends.
+
+    Backends that persist the verdict given at ingest time set
+    ``has_verdicts``; the others classify rows on demand with the
+    ``classifier`` callable they were created with, which takes a DataFrame
+    with ip, username and password columns and returns one verdict per row.
+    """
+
+    has_verdicts = False
+
+    def append(self, timestamp, ip, username, password, verdict=None):
+        """Persist a single login attempt."""
+        self.append_many([(timestamp, ip, username, password, verdict)])
+
+    def append_many(self, rows, sync=False):
+        """
+        Persist (timestamp, ip, username, password, verdict) rows in one write.
+        With ``sync`` the data is flushed to stable storage before returning.
+        """
+        raise NotImplementedError
+
+    def iter_rows(self):
+        """Yield every attempt as a (timestamp, ip, username, password) tuple."""
+        raise NotImplementedError
+
+    def rows_since(self, watermark=None):
+        """
+        Return (rows, watermark) for the attempts stored after ``watermark``.
+
+        Passing the returned watermark back in yields only newer attempts;
+        ``None`` starts from the beginning of the log.
+        """
+        raise NotImplementedError
+
+    def count(self):
+        """Return the total number of attempts."""
+        raise NotImplementedError
+
+    def unique_ip_count(self):
+        """Return the number of distinct source IPs."""
+        raise NotImplementedError
+
+    def distinct_ips(self):
+        """Return the list of distinct source IPs."""
+        raise NotImplementedError
+
+    def verdict_count(self, verdict):
+        """Return how many attempts were classified as ``verdict``."""
+        raise NotImplementedError
+
+    def top_values(self, column, limit=None, verdict=None, min_count=1):
+        """Return (value, count) pairs for ``column``, most frequent first."""
+        raise NotImplementedError
+
+    def bucket_counts(self, granularity, since=None, until=None):
+        """
+        Return a mapping of bucket to attempt count for ``granularity``
+        (minute, hour or day), read from rollups kept up to date as attempts
+        are written. ``since`` and ``until`` are inclusive datetimes; buckets
+        without attempts are omitted.
+        """
+        raise NotImplementedError
+
+    def ip_sketches(self, granularity, since, until, kind):
+        """
+        Return the HyperLogLog sketches of ``kind`` (ip or attacker_ip) for
+        the ``granularity`` buckets between ``since`` and ``until``.
+        """
+        raise NotImplementedError
+
+    def ip_sketch(self, since=None, until=None, verdict=None):
+        """
+        Return one HyperLogLog of the source IPs between ``since`` and
+        ``until`` (optionally only attempts classified as
+        ``verdict="attacker"``), merged from the per-bucket sketches. Short
+        recent ranges use hourly buckets, longer ones whole days.
+        """
+        if verdict not in (None, "attacker"):
+            raise ValueError(f"Unsupported verdict: {verdict}")
+        kind = "attacker_ip" if verdict == "attacker" else "ip"
+        end = until or datetime.now()
+        hourly = (since is not None and end - since <= timedelta(days=2)
+                  and since >= datetime.now() - timedelta(days=self.hour_sketch_retention_days))
+        sketches = self.ip_sketches("hour" if hourly else "day", since, until, kind)
+        # Buckets written before a precision change are folded to the smallest size
+        precision = min([sketch.precision for sketch in sketches] + [self.sketch_precision])
+        merged = HyperLogLog(precision)
+        for sketch in sketches:
+            merged.merge(sketch.reduced(precision))
+        return merged
+
+    def unique_ip_estimate(self, since=None, until=None, verdict=None):
+        """Estimate the number of distinct source IPs; see ``ip_sketch``."""
+        return self.ip_sketch(since, until, verdict).count()
+
+    def credential_stats(self):
+        """Return average credential lengths and common pattern counts."""
+        raise NotImplementedError
+
+    def recent(self, limit):
+        """Return the newest ``limit`` attempts as dicts, oldest first."""
+        raise NotImplementedError
+
+    def storage_bytes(self):
+        """Return the bytes the stored attempts take on disk."""
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+
+# Top values kept in segment summaries: (column, verdict filter)
+SEGMENT_TOP_KEYS = [(column, verdict) for column in sorted(QUERYABLE_COLUMNS) for verdict in (None, "attacker")]
+
+
+def _top_key(column, verdict):
+    return column if verdict is None else f"{column}:{verdict}"
+
+
+def credential_totals(usernames, passwords):
+    """Return the sums behind ``credential_stats`` for lists of usernames and passwords."""
+    lowered = [username.lower() for username in usernames]
+    return {
+        "rows": len(usernames),
+        "username_length": sum(len(username) for username in usernames),
+        "password_length": sum(len(password) for password in passwords),
+        "admin_variants": sum("admin" in username for username in lowered),
+        "root_variants": sum("root" in username for username in lowered),
+        "numeric_passwords": sum(password.isdigit() for password in passwords),
+        "simple_passwords": sum(password.lower() in SIMPLE_PASSWORDS for password in passwords),
+    }
+
+
+def credential_stats_from_totals(totals):
+    rows = totals.get("rows", 0)
+    return {
+        "avg_username_length": totals.get("username_length", 0) / rows if rows else 0.0,
+        "avg_password_length": totals.get("password_length", 0) / rows if rows else 0.0,
+        "admin_variants": totals.get("admin_variants", 0),
+        "root_variants": totals.get("root_variants", 0),
+        "numeric_passwords": totals.get("numeric_passwords", 0),
+        "simple_passwords": totals.get("simple_passwords", 0),
+    }
+
+
+def summarize_segment(rows, top_k=1000, sketch_precision=12, hour_cutoff=""):
+    """
+    Return the footer summary of a log segment holding (timestamp, ip,
+    username, password, verdict) ``rows``: verdict counts, rollups, the
+    ``top_k`` most frequent values per column, per-bucket IP sketches (hourly
+    ones only from ``hour_cutoff`` on), the distinct IPs and credential totals.
+    """
+    top = {}
+    for column, verdict in SEGMENT_TOP_KEYS:
+        index = LOG_COLUMNS.index(column)
+        counts = Counter(row[index] for row in rows if verdict is None or row[4] == verdict)
+        top[_top_key(column, verdict)] = counts.most_common(top_k)
+
+    ip_sketches = {}
+    for (granularity, bucket, kind), ips in ip_sketch_groups(rows).items():
+        if granularity == "hour" and bucket < hour_cutoff:
+            continue
+        sketch = HyperLogLog(sketch_precision)
+        sketch.update(ips)
+        ip_sketches.setdefault(granularity, {}).setdefault(bucket, {})[kind] = \
+            base64.b64encode(sketch.to_bytes()).decode("ascii")
+
+    return {
+        "rows": len(rows),
+        "first_timestamp": rows[0][0] if rows else None,
+        "last_timestamp": rows[-1][0] if rows else None,
+        "verdicts": dict(Counter(row[4] for row in rows if row[4] is not None)),
+        "rollups": {granularity: dict(counts) for granularity, counts in rollup_counts(rows).items()},
+        "top": top,
+        "ip_sketches": ip_sketches,
+        "ips": sorted({row[1] for row in rows}),
+        "credentials": credential_totals([row[2] for row in rows], [row[3] for row in rows]),
+    }
+
+
+def log_record(row):
+    """
+    Return a parsed CSV log line as a (timestamp, ip, username, password,
+    verdict) tuple. Lines logged before verdicts were stored have a verdict
+    of None.
+    """
+    return row[0], row[1], row[2], row[3], (row[4] or None) if len(row) > 4 else None
+
+
+def parse_log_lines(data):
+    """Parse CSV log bytes into log_record tuples, skipping setup.py's header."""
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return [log_record(row) for row in csv.reader(lines) if len(row) >= 4 and row[0] != "timestamp"]
+
+
+class SegmentIndex:
+    """
+    Running totals over the summary footers of a log's rotated segments.
+
+    Segments never change once written, so each footer is read once, when
+    its segment first appears, and queries about the history merge these
+    totals instead of rescanning it. Top values keep only the ``top_k`` most
+    frequent per column, so counts beyond that are approximate, as with the
+    live Space-Saving sketches. Not thread-safe; the store serializes access.
+    """
+
+    def __init__(self, directory, top_k=1000, minute_retention_days=7, hour_sketch_retention_days=7):
+        self.directory = directory
+        self.top_k = top_k
+        self.minute_retention_days = minute_retention_days
+        self.hour_sketch_retention_days = hour_sketch_retention_days
+        self.spans = []  # (path, start offset, bytes) per segment, oldest first
+        self.end_offset = 0  # where the active log starts in the whole history
+        self.newest = None  # summary of the newest segment
+        self.rows = 0
+        self.verdicts = Counter()
+        self.rollups = rollup_counts([])
+        self.ip_sketches = {}  # (granularity, bucket, kind) -> HyperLogLog
+        self.top = {_top_key(column, verdict): Counter() for column, verdict in SEGMENT_TOP_KEYS}
+        self.ips = set()
+        self.credentials = Counter()
+
+    def refresh(self):
+        """Fold in segments written since the last call, by any process."""
+        paths = segment_paths(self.directory)
+        if len(paths) == len(self.spans):
+            return self
+        for path in paths[len(self.spans):]:
+            self._add(path, read_segment_summary(path))
+
+        now = datetime.now()
+        cutoff = bucket_key(now - timedelta(days=self.minute_retention_days), "minute")
+        minutes = self.rollups["minute"]
+        for bucket in [bucket for bucket in minutes if bucket < cutoff]:
+            del minutes[bucket]
+        cutoff = bucket_key(now - timedelta(days=self.hour_sketch_retention_days), "hour")
+        for key in [key for key in self.ip_sketches if key[0] == "hour" and key[1] < cutoff]:
+            del self.ip_sketches[key]
+        return self
+
+    def _add(self, path, summary):
+        self.spans.append((path, summary["start_offset"], summary["bytes"]))
+        self.end_offset = summary["start_offset"] + summary["bytes"]
+        self.newest = summary
+        self.rows += summary["rows"]
+        self.verdicts.update(summary["verdicts"])
+        for granularity, counts in summary["rollups"].items():
+            self.rollups[granularity].update(counts)
+        for key, pairs in summary["top"].items():
+            counts = self.top.setdefault(key, Counter())
+            counts.update(dict(pairs))
+            if len(counts) > self.top_k:
+                self.top[key] = Counter(dict(counts.most_common(self.top_k)))
+        for granularity, buckets in summary["ip_sketches"].items():
+            for bucket, kinds in buckets.items():
+                for kind, registers in kinds.items():
+                    sketch = HyperLogLog.from_bytes(base64.b64decode(registers))
+                    key = (granularity, bucket, kind)
+                    existing = self.ip_sketches.get(key)
+                    if existing is None:
+                        self.ip_sketches[key] = sketch
+                    else:
+                        precision = min(existing.precision, sketch.precision)
+                        self.ip_sketches[key] = existing.reduced(precision).merge(sketch.reduced(precision))
+        self.ips.update(summary["ips"])
+        self.credentials.update(summary["credentials"])
+
+
+class CSVAttemptStore(AttemptStore):
+    """
+    Attempt store backed by the plain logs.csv file.
+
+    The verdict given at ingest time is written as a fifth column; rows
+    logged before that (with four columns) are classified on demand.
+    With ``segment_max_bytes`` set, the log is rotated into immutable,
+    gzip-compressed segments in ``segment_dir`` whenever it reaches that
+    size. Each segment carries a summary footer (see SegmentIndex), so
+    analytics merge the segment totals and only parse the active log.
+    Writers share a lock file with rotation, so several processes
+    can append to the same log.
+    """
+
+    has_verdicts = True
+
+    def __init__(self, path, classifier=None, minute_retention_days=7, sketch_precision=12,
+                 hour_sketch_retention_days=7, segment_dir=None, segment_max_bytes=0, top_k=1000):
+        self.path = path
+        self.classifier = classifier
+        self.minute_retention_days = minute_retention_days
+        self.sketch_precision = sketch_precision
+        self.hour_sketch_retention_days = hour_sketch_retention_days
+        self.segment_dir = segment_dir or f"{path}.segments"
+        self.segment_max_bytes = segment_max_bytes
+        self.top_k = top_k
+        self._lock_path = f"{path}.lock"
+        self._lock = threading.Lock()
+        self._segments = SegmentIndex(self.segment_dir, top_k, minute_retention_days, hour_sketch_retention_days)
+        self._frame_key = None
+        self._frame = None
+        self._rollups = rollup_counts([])
+        self._ip_sketches = {}  # (granularity, bucket, kind) -> HyperLogLog
+        self._rollup_watermark = 0
+        if self.segment_max_bytes:
+            os.makedirs(self.segment_dir, exist_ok=True)
+            with self._rotation_lock(exclusive=True):
+                self._recover_rotation(self._segments.refresh())
+
+    @contextlib.contextmanager
+    def _rotation_lock(self, exclusive=False):
+        """
+        Hold the log's lock file: shared while appending or reading, exclusive
+        while rotating. Without rotation there is nothing to exclude.
+        """
+        if not self.segment_max_bytes:
+            yield
+            return
+        import fcntl
+
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    @contextlib.contextmanager
+    def _reading(self):
+        """Refreshed segment totals, with no rotation able to move rows between them and the active log."""
+        with self._rotation_lock(), self._lock:
+            yield self._segments.refresh()
+
+    def append_many(self, rows, sync=False):
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows([*row[:4], row[4] or ""] for row in rows)
+        data = buffer.getvalue().encode("utf-8")
+
+        with self._rotation_lock():
+            # One O_APPEND write per batch, so batches from several processes never interleave
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+                if sync:
+                    os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        if self.segment_max_bytes and size >= self.segment_max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Move the active log into compressed segments once it has reached ``segment_max_bytes``."""
+        with self._rotation_lock(exclusive=True), self._lock:
+            segments = self._segments.refresh()
+            self._recover_rotation(segments)
+            try:
+                with open(self.path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            if len(data) < self.segment_max_bytes:
+                return  # Another process rotated it first
+
+            hour_cutoff = bucket_key(datetime.now() - timedelta(days=self.hour_sketch_retention_days), "hour")
+            position = 0
+            while position < len(data):
+                # Cut at a line boundary; a single line longer than the limit stays whole
+                end = data.rfind(b"\n", position, position + self.segment_max_bytes) + 1
+                if end <= position:
+                    end = data.find(b"\n", position + self.segment_max_bytes) + 1 or len(data)
+                piece = data[position:end]
+                rows = self._with_verdicts(parse_log_lines(piece))
+                summary = summarize_segment(rows, self.top_k, self.sketch_precision, hour_cutoff)
+                summary.update({
+                    "start_offset": segments.end_offset + position,
+                    "bytes": len(piece),
+                    # Lets _recover_rotation tell whether the active log still holds this piece
+                    "source_offset": position,
+                    "source_crc32": zlib.crc32(piece),
+                })
+                write_segment(next_segment_path(self.segment_dir), piece, summary)
+                position = end
+
+            os.truncate(self.path, 0)
+            segments.refresh()
+
+    def _recover_rotation(self, segments):
+        """Drop rows left in the active log by a rotation interrupted after writing its segments."""
+        newest = segments.newest
+        if newest is None:
+            return
+        end = newest["source_offset"] + newest["bytes"]
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if len(data) >= end and zlib.crc32(data[newest["source_offset"]:end]) == newest["source_crc32"]:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data[end:])
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def _with_verdicts(self, rows):
+        """Return log records with the verdicts of rows logged without one filled in by the classifier."""
+        missing = [i for i, row in enumerate(rows) if row[4] is None]
+        if not missing or self.classifier is None:
+            return rows
+        verdicts = self.classifier(rows_frame([rows[i][:4] for i in missing]))
+        rows = list(rows)
+        for i, verdict in zip(missing, verdicts):
+            rows[i] = rows[i][:4] + (verdict,)
+        return rows
+
+    def storage_bytes(self):
+        sizes = [os.path.getsize(path) for path, _, _ in self._segments.spans if os.path.exists(path)]
+        return super().storage_bytes() + sum(sizes)
+
+    def iter_rows(self):
+        with self._reading() as segments:
+            spans = list(segments.spans)
+        for path, _, _ in spans:
+            for row in parse_log_lines(read_segment_data(path)):
+                yield row[:4]
+        for row in self._active_rows():
+            yield row[:4]
+
+    def iter_batches(self, batch_size=10000):
+        """
+        Yield the whole history, oldest first, as lists of at most
+        ``batch_size`` (timestamp, ip, username, password, verdict) rows, with
+        rows logged without a verdict classified batch by batch.
+        """
+        with self._reading() as segments:
+            spans = list(segments.spans)
+        sources = [parse_log_lines(read_segment_data(path)) for path, _, _ in spans]
+        batch = []
+        for row in itertools.chain(itertools.chain.from_iterable(sources), self._active_rows()):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield self._with_verdicts(batch)
+                batch = []
+        if batch:
+            yield self._with_verdicts(batch)
+
+    def _active_rows(self):
+        try:
+            with open(self.path, newline='') as f:
+                for row in csv.reader(f):
+                    # Skip the optional header row written by setup.py
+                    if len(row) >= 4 and row[0] != "timestamp":
+                        yield log_record(row)
+        except FileNotFoundError:
+            return
+
+    def rows_since(self, watermark=None):
+        # The watermark is a byte offset into the whole history: the segments, then the active log
+        with self._reading() as segments:
+            rows, watermark = self._rows_since(segments, watermark or 0)
+        return [row[:4] for row in rows], watermark
+
+    def _rows_since(self, segments, offset):
+        base = segments.end_offset
+        try:
+            with open(self.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if offset > base + size:
+                    offset = 0  # The log was truncated or replaced
+                f.seek(max(0, offset - base))
+                data = f.read()
+        except FileNotFoundError:
+            return [], base
+
+        # Older rows come from the segments that end after the offset
+        history = [
+            read_segment_data(path)[max(0, offset - start):]
+            for path, start, length in segments.spans
+            if start + length > offset
+        ]
+        # Only consume complete lines; a concurrent append may be half written
+        end = data.rfind(b"\n") + 1
+        rows = parse_log_lines(b"".join(history) + data[:end])
+        return rows, max(offset, base) + end
+
+    def _load_frame(self, segments):
+        """Parse the active log into a DataFrame, reusing it until the file changes."""
+        try:
+            st = os.stat(self.path)
+            key = (segments.end_offset, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            key = None
+
+        if self._frame is not None and key == self._frame_key:
+            return self._frame
+        frame = rows_frame(list(self._active_rows()), verdicts=True)
+        self._frame = frame
+        self._frame_key = key
+        return frame
+
+    def _verdicts(self, df):
+        """The ingest verdicts of ``df``, classifying rows logged without one (in place, so once per frame)."""
+        missing = df['verdict'].isna()
+        if missing.any() and self.classifier is not None:
+            df.loc[missing, 'verdict'] = self.classifier(df[missing])
+        return df['verdict']
+
+    def count(self):
+        with self._reading() as segments:
+            return segments.rows + len(self._load_frame(segments))
+
+    def unique_ip_count(self):
+        with self._reading() as segments:
+            active = self._load_frame(segments)['ip'].unique()
+            return len(segments.ips) + sum(1 for ip in active if ip not in segments.ips)
+
+    def distinct_ips(self):
+        with self._reading() as segments:
+            active = self._load_frame(segments)['ip'].unique()
+            return list(segments.ips) + [ip for ip in active if ip not in segments.ips]
+
+    def verdict_count(self, verdict):
+        with self._reading() as segments:
+            df = self._load_frame(segments)
+            return segments.verdicts[verdict] + int((self._verdicts(df) == verdict).sum())
+
+    def top_values(self, column, limit=None, verdict=None, min_count=1):
+        if column not in QUERYABLE_COLUMNS:
+            raise ValueError(f"Unsupported column: {column}")
+        if verdict not in (None, "attacker"):
+            raise ValueError(f"Unsupported verdict: {verdict}")
+        with self._reading() as segments:
+            df = self._load_frame(segments)
+            values = df[column]
+            if verdict is not None:
+                values = values[self._verdicts(df) == verdict]
+            counts = Counter(segments.top[_top_key(column, verdict)])
+            counts.update(values.value_counts().to_dict())
+        pairs = [(value, int(count)) for value, count in counts.most_common(limit) if count >= min_count]
+        return pairs
+
+    def _update_rollups(self, segments):
+        """Fold rows appended to the active log since the last call (by any process) into the rollups."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if self._rollup_watermark < segments.end_offset or size < self._rollup_watermark - segments.end_offset:
+            # The log was rotated, truncated or replaced; start over from the active log
+            self._rollups = rollup_counts([])
+            self._ip_sketches = {}
+            self._rollup_watermark = segments.end_offset
+        if size == self._rollup_watermark - segments.end_offset:
+            return
+
+        rows, self._rollup_watermark = self._rows_since(segments, self._rollup_watermark)
+        for granularity, counts in rollup_counts(rows).items():
+            self._rollups[granularity].update(counts)
+
+        groups = ip_sketch_groups(self._with_verdicts(rows))
+        for key, ips in groups.items():
+            sketch = self._ip_sketches.get(key)
+            if sketch is None:
+                sketch = self._ip_sketches[key] = HyperLogLog(self.sketch_precision)
+            sketch.update(ips)
+
+        now = datetime.now()
+        cutoff = bucket_key(now - timedelta(days=self.minute_retention_days), "minute")
+        minutes = self._rollups["minute"]
+        for bucket in [bucket for bucket in minutes if bucket < cutoff]:
+            del minutes[bucket]
+        cutoff = bucket_key(now - timedelta(days=self.hour_sketch_retention_days), "hour")
+        for key in [key for key in self._ip_sketches if key[0] == "hour" and key[1] < cutoff]:
+            del self._ip_sketches[key]
+
+    def bucket_counts(self, granularity, since=None, until=None):
+        if granularity not in ROLLUP_FORMATS:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        low = bucket_key(since, granularity) if since is not None else ""
+        high = bucket_key(until, granularity) if until is not None else None
+        with self._reading() as segments:
+            self._update_rollups(segments)
+            counts = segments.rollups[granularity] + self._rollups[granularity]
+        return {
+            bucket: count
+            for bucket, count in sorted(counts.items())
+            if bucket >= low and (high is None or bucket <= high)
+        }
+
+    def ip_sketches(self, granularity, since, until, kind):
+        low = bucket_key(since, granularity) if since is not None else ""
+        high = bucket_key(until, granularity) if until is not None else None
+        with self._reading() as segments:
+            self._update_rollups(segments)
+            return [
+                sketch
+                for sketches in (segments.ip_sketches, self._ip_sketches)
+                for (sketch_granularity, bucket, sketch_kind), sketch in sketches.items()
+                if sketch_granularity == granularity and sketch_kind == kind
+                and bucket >= low and (high is None or bucket <= high)
+            ]
+
+    def credential_stats(self):
+        with self._reading() as segments:
+            df = self._load_frame(segments)
+            totals = Counter(segments.credentials)
+        usernames = df['username'].str.lower()
+        passwords = df['password']
+        totals.update({
+            "rows": len(df),
+            "username_length": int(df['username'].str.len().sum()),
+            "password_length": int(passwords.str.len().sum()),
+            "admin_variants": int(usernames.str.contains('admin', regex=False).sum()),
+            "root_variants": int(usernames.str.contains('root', regex=False).sum()),
+            "numeric_passwords": int(passwords.str.isdigit().sum()),
+            "simple_passwords": int(passwords.str.lower().isin(SIMPLE_PASSWORDS).sum()),
+        })
+        return credential_stats_from_totals(totals)
+
+    def _tail_lines(self, limit, block_size=65536):
+        """Return the last ``limit`` complete lines of the log, reading backwards from the end."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            end = os.fstat(f.fileno()).st_size
+            position = end
+            data = b""
+            # One extra newline so the first returned line is complete
+            while position > 0 and data.count(b"\n") <= limit:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        # Drop a partially written final line
+        data = data[:data.rfind(b"\n") + 1]
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        if position > 0:
+            lines = lines[1:]
+        return lines[-limit:] if limit > 0 else []
+
+    def recent(self, limit):
+        with self._reading() as segments:
+            rows = parse_log_lines("\n".join(self._tail_lines(limit + 1)).encode("utf-8"))[-limit:]
+            # Just after a rotation the active log is short; the rest comes from the newest segments
+            for path, _, _ in reversed(segments.spans):
+                if len(rows) >= limit:
+                    break
+                rows = parse_log_lines(read_segment_data(path))[-(limit - len(rows)):] + rows
+        return [
+            {"timestamp": ts, "ip": ip, "username": username, "password": password, "verdict": verdict}
+            for ts, ip, username, password, verdict in self._with_verdicts(rows)
+        ]
+
+
+class SQLiteAttemptStore(AttemptStore):
+    """
+    Attempt store backed by an indexed SQLite database in WAL mode.
+
+    The verdict given at ingest time is stored with each attempt, so the
+    analytics queries never need to re-run the classifier.
+    """
+
+    has_verdicts = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            ip TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            verdict TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_attempts_timestamp ON attempts(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_attempts_ip ON attempts(ip);
+        CREATE INDEX IF NOT EXISTS idx_attempts_verdict ON attempts(verdict, ip);
+    """ + "".join(f"""
+        CREATE TABLE IF NOT EXISTS rollup_{granularity} (
+            bucket TEXT PRIMARY KEY,
+            attempts INTEGER NOT NULL
+        ) WITHOUT ROWID;
+    """ for granularity in ROLLUP_FORMATS) + "".join(f"""
+        CREATE TABLE IF NOT EXISTS ip_sketch_{granularity} (
+            bucket TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            registers BLOB NOT NULL,
+            PRIMARY KEY (bucket, kind)
+        ) WITHOUT ROWID;
+    """ for granularity in IP_SKETCH_GRANULARITIES)
+
+    def __init__(self, path, classifier=None, minute_retention_days=7, sketch_precision=12,
+                 hour_sketch_retention_days=7):
+        self.path = path
+        self.classifier = classifier
+        self.minute_retention_days = minute_retention_days
+        self.sketch_precision = sketch_precision
+        self.hour_sketch_retention_days = hour_sketch_retention_days
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        self._backfill_rollups(conn)
+
+    def _backfill_rollups(self, conn):
+        """Build the rollups for databases created before they existed."""
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not conn.execute("SELECT 1 FROM rollup_day LIMIT 1").fetchone():
+                for granularity, length in ROLLUP_PREFIX_LENGTHS.items():
+                    conn.execute(
+                        f"INSERT INTO rollup_{granularity} (bucket, attempts) "
+                        f"SELECT substr(timestamp, 1, {length}) AS bucket, COUNT(*) FROM attempts GROUP BY bucket"
+                    )
+            if not conn.execute("SELECT 1 FROM ip_sketch_day LIMIT 1").fetchone():
+                cursor = conn.execute("SELECT timestamp, ip, NULL, NULL, verdict FROM attempts ORDER BY id")
+                while True:
+                    rows = cursor.fetchmany(10000)
+                    if not rows:
+                        break
+                    self._update_ip_sketches(conn, rows)
+
+    def _update_ip_sketches(self, conn, rows):
+        """Merge a batch of rows into the per-bucket IP sketches; caller holds the transaction."""
+        for (granularity, bucket, kind), ips in ip_sketch_groups(rows).items():
+            row = conn.execute(
+                f"SELECT registers FROM ip_sketch_{granularity} WHERE bucket = ? AND kind = ?", (bucket, kind)
+            ).fetchone()
+            sketch = HyperLogLog.from_bytes(row[0]) if row else HyperLogLog(self.sketch_precision)
+            sketch.update(ips)
+            conn.execute(
+                f"INSERT OR REPLACE INTO ip_sketch_{granularity} (bucket, kind, registers) VALUES (?, ?, ?)",
+                (bucket, kind, sketch.to_bytes())
+            )
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def _query(self, sql, params=()):
+        return self._connection().execute(sql, params).fetchall()
+
+    def append_many(self, rows, sync=False):
+        conn = self._connection()
+        # In WAL mode FULL syncs the log on commit; NORMAL defers it to checkpoints
+        conn.execute(f"PRAGMA synchronous={'FULL' if sync else 'NORMAL'}")
+        with conn:
+            self._insert(conn, rows)
+
+    def import_csv_log(self, path, segment_dir=None, batch_size=10000):
+        """
+        Copy the CSV attempt log at ``path`` (and its rotated segments in
+        ``segment_dir``) into an empty database, so switching ATTEMPT_STORE to
+        sqlite keeps the history. Does nothing once the database holds any
+        attempt; several processes may call it at startup, and only the first
+        imports. Returns the number of attempts imported.
+        """
+        if self._query("SELECT 1 FROM attempts LIMIT 1") or not (
+                os.path.exists(path) or segment_paths(segment_dir or f"{path}.segments")):
+            return 0
+        source = CSVAttemptStore(path, classifier=self.classifier, segment_dir=segment_dir)
+        conn = self._connection()
+        imported = 0
+        # One transaction, so other processes see either no history or all of it
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM attempts LIMIT 1").fetchone():
+                return 0
+            for batch in source.iter_batches(batch_size):
+                self._insert(conn, batch)
+                imported += len(batch)
+        return imported
+
+    def _insert(self, conn, rows):
+        """Insert (timestamp, ip, username, password, verdict) rows; caller holds the transaction."""
+        conn.executemany(
+            "INSERT INTO attempts (timestamp, ip, username, password, verdict) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        # Rollups are updated in the same transaction, so they always match the attempts
+        for granularity, counts in rollup_counts(rows).items():
+            conn.executemany(
+                f"INSERT INTO rollup_{granularity} (bucket, attempts) VALUES (?, ?) "
+                "ON CONFLICT(bucket) DO UPDATE SET attempts = attempts + excluded.attempts",
+                counts.items()
+            )
+        self._update_ip_sketches(conn, rows)
+        now = datetime.now()
+        cutoff = bucket_key(now - timedelta(days=self.minute_retention_days), "minute")
+        conn.execute("DELETE FROM rollup_minute WHERE bucket < ?", (cutoff,))
+        cutoff = bucket_key(now - timedelta(days=self.hour_sketch_retention_days), "hour")
+        conn.execute("DELETE FROM ip_sketch_hour WHERE bucket < ?", (cutoff,))
+
+    def iter_rows(self):
+        cursor = self._connection().execute(
+            "SELECT timestamp, ip, username, password FROM attempts ORDER BY id"
+        )
+        yield from cursor
+
+    def rows_since(self, watermark=None):
+        # The watermark is the last attempt id that has been read
+        watermark = watermark or 0
+        if watermark > (self._query("SELECT MAX(id) FROM attempts")[0][0] or 0):
+            watermark = 0  # Not from this database, e.g. a CSV log offset; start over
+        rows = self._query(
+            "SELECT id, timestamp, ip, username, password FROM attempts WHERE id > ? ORDER BY id",
+            (watermark,)
+        )
+        if not rows:
+            return [], watermark or 0
+        return [row[1:] for row in rows], rows[-1][0]
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM attempts")[0][0]
+
+    def unique_ip_count(self):
+        return self._query("SELECT COUNT(DISTINCT ip) FROM attempts")[0][0]
+
+    def distinct_ips(self):
+        return [row[0] for row in self._query("SELECT DISTINCT ip FROM attempts")]
+
+    def verdict_count(self, verdict):
+        return self._query("SELECT COUNT(*) FROM attempts WHERE verdict = ?", (verdict,))[0][0]
+
+    def top_values(self, column, limit=None, verdict=None, min_count=1):
+        if column not in QUERYABLE_COLUMNS:
+            raise ValueError(f"Unsupported column: {column}")
+        sql = f"SELECT {column}, COUNT(*) AS n FROM attempts"
+        params = []
+        if verdict is not None:
+            sql += " WHERE verdict = ?"
+            params.append(verdict)
+        sql += f" GROUP BY {column} HAVING n >= ? ORDER BY n DESC"
+        params.append(min_count)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [(value, count) for value, count in self._query(sql, params)]
+
+    def bucket_counts(self, granularity, since=None, until=None):
+        if granularity not in ROLLUP_FORMATS:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        sql = f"SELECT bucket, attempts FROM rollup_{granularity} WHERE bucket >= ?"
+        params = [bucket_key(since, granularity) if since is not None else ""]
+        if until is not None:
+            sql += " AND bucket <= ?"
+            params.append(bucket_key(until, granularity))
+        return dict(self._query(sql + " ORDER BY bucket", params))
+
+    def ip_sketches(self, granularity, since, until, kind):
+        if granularity not in IP_SKETCH_GRANULARITIES:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        sql = f"SELECT registers FROM ip_sketch_{granularity} WHERE kind = ? AND bucket >= ?"
+        params = [kind, bucket_key(since, granularity) if since is not None else ""]
+        if until is not None:
+            sql += " AND bucket <= ?"
+            params.append(bucket_key(until, granularity))
+        return [HyperLogLog.from_bytes(row[0]) for row in self._query(sql, params)]
+
+    def credential_stats(self):
+        placeholders = ", ".join("?" for _ in SIMPLE_PASSWORDS)
+        row = self._query(
+            "SELECT AVG(length(username)), AVG(length(password)), "
+            "SUM(instr(lower(username), 'admin') > 0), "
+            "SUM(instr(lower(username), 'root') > 0), "
+            "SUM(password != '' AND password NOT GLOB '*[^0-9]*'), "
+            f"SUM(lower(password) IN ({placeholders})) "
+            "FROM attempts",
+            SIMPLE_PASSWORDS
+        )[0]
+        return {
+            "avg_username_length": row[0] or 0.0,
+            "avg_password_length": row[1] or 0.0,
+            "admin_variants": row[2] or 0,
+            "root_variants": row[3] or 0,
+            "numeric_passwords": row[4] or 0,
+            "simple_passwords": row[5] or 0,
+        }
+
+    def recent(self, limit):
+        rows = self._query(
+            "SELECT timestamp, ip, username, password, verdict FROM attempts "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        return [
+            {"timestamp": ts, "ip": ip, "username": username, "password": password, "verdict": verdict}
+            for ts, ip, username, password, verdict in reversed(rows)
+        ]
+
+
+class BufferedAttemptWriter:
+    """
+    Group-commit writer that takes attempt writes off the request path.
+
+    Rows are queued in a bounded in-memory queue (callers block when it is
+    full) and a single writer thread appends them to the store in batches,
+    flushing when ``batch_size`` rows are waiting or ``flush_interval``
+    seconds after the first row of a batch arrived. ``fsync`` is one of
+    ``none``, ``interval`` (at most every ``fsync_interval`` seconds) or
+    ``batch``. A ``max_queue`` of 0 writes every row synchronously.
+    ``on_flush`` is called with each batch once it has been written, and
+    ``on_write(seconds, rows)`` with the time each successful write took.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store, max_queue=10000, batch_size=500, flush_interval=0.2,
+                 fsync="interval", fsync_interval=1.0, on_flush=None, logger=None, on_write=None):
+        if fsync not in ("none", "interval", "batch"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.store = store
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.on_flush = on_flush
+        self.on_write = on_write
+        self.logger = logger
+        self.batches = 0
+        self.rows_written = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+        self._last_sync = time.monotonic()
+        self._write_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue) if max_queue > 0 else None
+        self._thread = None
+        if self._queue is not None:
+            self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, timestamp, ip, username, password, verdict=None):
+        """Queue one attempt for writing."""
+        row = (timestamp, ip, username, password, verdict)
+        if self._queue is None:
+            self._write([row])
+        else:
+            self._queue.put(row)
+
+    def _should_sync(self):
+        if self.fsync == "batch":
+            return True
+        if self.fsync == "interval":
+            return time.monotonic() - self._last_sync >= self.fsync_interval
+        return False
+
+    def _write(self, batch):
+        with self._write_lock:
+            started = time.perf_counter()
+            sync = self._should_sync()
+            try:
+                self.store.append_many(batch, sync=sync)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Error writing {len(batch)} attempt(s): {e}")
+                return
+            if sync:
+                self._last_sync = time.monotonic()
+            elapsed = time.perf_counter() - started
+
+            self.batches += 1
+            self.rows_written += len(batch)
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self.total_flush_seconds += elapsed
+            if self.on_write is not None:
+                self.on_write(elapsed, len(batch))
+            # Called under the write lock, so callbacks never run concurrently
+            if self.on_flush is not None:
+                try:
+                    self.on_flush(batch)
+                except Exception as e:
+                    # The rows are stored; a failing callback must not stop the writer thread
+                    if self.logger is not None:
+                        self.logger.error(f"Error handling {len(batch)} written attempt(s): {e}")
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is self._STOP:
+                self._queue.task_done()
+                return
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is self._STOP:
+                    stop = True
+                    break
+                batch.append(row)
+            try:
+                self._write(batch)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Error in attempt writer: {e}")
+            finally:
+                # Always release flush() waiters, even if the batch was lost
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def paused(self):
+        """Return a context manager that holds off writes (and ``on_flush``) while it is entered."""
+        return self._write_lock
+
+    def flush(self):
+        """Block until every queued attempt has been written."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def stats(self):
+        """Return queue depth and flush latency figures."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "rows_written": self.rows_written,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+            "avg_flush_ms": round(self.total_flush_seconds / self.batches * 1000, 3) if self.batches else 0.0
+        }
+
+
+def create_store(config, classifier=None):
+    """Build the attempt store selected by ``ATTEMPT_STORE`` in ``config``."""
+    backend = config.get('ATTEMPT_STORE', 'csv').lower()
+    options = {
+        "minute_retention_days": config.get('ROLLUP_MINUTE_RETENTION_DAYS', 7),
+        "sketch_precision": config.get('UNIQUE_IP_SKETCH_PRECISION', 12),
+        "hour_sketch_retention_days": config.get('UNIQUE_IP_HOURLY_RETENTION_DAYS', 7),
+    }
+    if backend == "sqlite":
+        return SQLiteAttemptStore(config['ATTEMPT_DB_FILE'], classifier=classifier, **options)
+    if backend == "csv":
+        return CSVAttemptStore(
+            config['LOG_FILE'], classifier=classifier,
+            segment_dir=config.get('LOG_SEGMENT_DIR'),
+            segment_max_bytes=config.get('LOG_SEGMENT_MAX_BYTES', 0),
+            top_k=capacity_for_error(config.get('TOP_K_ERROR', 0.001)),
+            **options
+        )
+    raise ValueError(f"Unknown attempt store backend: {backend}")
@@ -0,0 +1,108 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Store Switch Tests
+
+Switching ATTEMPT_STORE from csv to sqlite imports the CSV history and must
+leave retraining working. app.py reads its settings at import, so each
+phase runs the app in its own interpreter.
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+from storage import CSVAttemptStore, SQLiteAttemptStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter: optionally add attempts, retrain, print the model state
+CHILD = """
+import json, sys
+sys.path.insert(0, {root!r})
+import app
+rows = {rows!r}
+if rows:
+    app.attempt_store.append_many([tuple(row) for row in rows])
+before = {{"version": app.current_model.version, "watermark": app.current_model.watermark}}
+app.retrain_model()
+print(json.dumps({{
+    "before": before,
+    "version": app.current_model.version,
+    "watermark": app.current_model.watermark,
+    "count": app.attempt_store.count(),
+}}))
+"""
+
+
+def make_rows(count, start=0):
+    base = datetime(2025, 6, 15, 10, 0, 0)
+    rows = []
+    for i in range(start, start + count):
+        attacker = i % 3 == 0
+        rows.append((
+            str(base + timedelta(seconds=i)),
+            f"203.0.113.{i % 50}" if attacker else f"10.0.{i % 7}.{i % 200}",
+            "admin" if attacker else f"user{i}.name",
+            "123456" if attacker else f"Complex-Pass-{i}!",
+            "attacker" if attacker else "normal_user",
+        ))
+    return rows
+
+
+def run_app(workdir, store, rows=()):
+    env = dict(
+        os.environ,
+        ATTEMPT_STORE=store,
+        LOG_FILE="logs.csv",
+        ATTEMPT_DB_FILE="attempts.db",
+        RETRAIN_MODE="incremental",
+        RETRAIN_THRESHOLD="1000000000",
+        LOG_SEGMENT_MAX_BYTES="0",
+        GEOLOCATION_API_URL="http://127.0.0.1:9/json/",
+        GEOLOCATION_BATCH_URL="http://127.0.0.1:9/batch",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT, rows=[list(row) for row in rows])],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_retrain_after_switching_from_csv_to_sqlite(tmp_path):
+    with open(tmp_path / "logs.csv", "w", newline="") as f:
+        csv.writer(f).writerows(make_rows(300))
+
+    # Trained on the CSV store: the watermark is a byte offset into logs.csv
+    trained = run_app(tmp_path, "csv")
+    assert trained["version"] == 1
+    assert trained["watermark"] == os.path.getsize(tmp_path / "logs.csv")
+
+    # The first SQLite start imports the log and drops the CSV watermark, so this retrain is a full refit
+    switched = run_app(tmp_path, "sqlite", make_rows(50, start=300))
+    assert switched["before"] == {"version": 2, "watermark": None}
+    assert switched["count"] == 350
+    assert switched["version"] == 3
+    assert switched["watermark"] == 350
+
+    # Later retrains continue incrementally from the attempt id
+    updated = run_app(tmp_path, "sqlite", make_rows(20, start=350))
+    assert updated["version"] == 4
+    assert updated["watermark"] == 370
+
+
+def test_sqlite_rows_since_ignores_foreign_watermark(tmp_path):
+    rows = make_rows(40)
+    csv_store = CSVAttemptStore(str(tmp_path / "logs.csv"))
+    csv_store.append_many(rows)
+    _, csv_watermark = csv_store.rows_since(None)
+
+    store = SQLiteAttemptStore(str(tmp_path / "attempts.db"))
+    assert store.import_csv_log(str(tmp_path / "logs.csv")) == 40
+    # A CSV byte offset is past every attempt id, so reading starts over
+    imported, watermark = store.rows_since(csv_watermark)
+    assert imported == [row[:4] for row in rows]
+    assert watermark == 40
+    assert store.rows_since(watermark) == ([], 40)
@@ -0,0 +1,107 @@
+"""
+Alpha - Honeypot Threat Intelligence Solution
+Velocity Tracking Module
+
+Per-IP sliding-window counters for login attempts. The tracker supplies the
+attempt velocity and distinct-username features for live classification and
+lets the login handler label an IP that is already brute-forcing without
+running the model.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from features import MAX_TRACKED_USERNAMES, VELOCITY_WINDOW_SECONDS
+
+
+class _IPWindow:
+    """Attempt counts for one IP in ``slots`` fixed-width time slots."""
+
+    __slots__ = ('counts', 'head', 'usernames', 'last_seen')
+
+    def __init__(self, slots):
+        self.counts = [0] * slots
+        self.head = None  # absolute index of the newest slot
+        self.usernames = {}  # username -> last seen, oldest first
+        self.last_seen = 0.0
+
+    def advance(self, slot):
+        """Move the window forward to ``slot``, clearing slots that fell out of it."""
+        slots = len(self.counts)
+        if self.head is None or slot - self.head >= slots:
+            self.counts = [0] * slots
+        else:
+            for stale in range(self.head + 1, slot + 1):
+                self.counts[stale % slots] = 0
+        if self.head is None or slot > self.head:
+            self.head = slot
+
+
+class VelocityTracker:
+    """
+    Sliding-window attempt and distinct-username counts per IP.
+
+    Each IP's window is split into ``slots`` counters, so the attempt count
+    is exact to within one slot width however fast the IP sends. At most
+    ``max_ips`` IPs are tracked, least recently seen first out, and IPs idle
+    for a whole window are dropped as new attempts arrive. Memory is bounded
+    by ``max_ips`` times (``slots`` counters plus MAX_TRACKED_USERNAMES
+    usernames).
+    """
+
+    def __init__(self, window=VELOCITY_WINDOW_SECONDS, slots=12, max_ips=100000):
+        self.window = window
+        self.slot_width = window / slots
+        self.slots = slots
+        self.max_ips = max_ips
+        self._entries = OrderedDict()  # ip -> _IPWindow, least recently seen first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, now):
+        while self._entries:
+            ip, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_ips and entry.last_seen > now - self.window:
+                break
+            del self._entries[ip]
+
+    def _activity(self, entry, now):
+        entry.advance(int(now // self.slot_width))
+        usernames = entry.usernames
+        cutoff = now - self.window
+        while usernames:
+            username, seen = next(iter(usernames.items()))
+            if seen > cutoff and len(usernames) <= MAX_TRACKED_USERNAMES:
+                break
+            del usernames[username]
+        return sum(entry.counts), len(usernames)
+
+    def record(self, ip, username, now=None):
+        """Count one attempt and return the IP's (attempts, distinct usernames) in the window."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None:
+                entry = self._entries[ip] = _IPWindow(self.slots)
+            else:
+                self._entries.move_to_end(ip)
+            entry.last_seen = now
+            entry.advance(int(now // self.slot_width))
+            entry.counts[entry.head % self.slots] += 1
+            entry.usernames.pop(username, None)
+            entry.usernames[username] = now
+            activity = self._activity(entry, now)
+            self._evict(now)
+            return activity
+
+    def activity(self, ip, now=None):
+        """Return the IP's (attempts, distinct usernames) in the window without counting an attempt."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None or entry.last_seen <= now - self.window:
+                return 0, 0
+            return self._activity(entry, now)